@@ -0,0 +1,41 @@
+"""add covering index on kits.code
+
+Revision ID: 014_kits_code_covering_index
+Revises: 013_rename_kit_items_to_items
+Create Date: 2026-02-02
+
+Replaces the unique index on kits.code with a unique covering index that
+INCLUDEs the kit details read by kit lookups (QR scans). The created_at and
+updated_at timestamps are not included, since updated_at changes on every kit
+write. On other dialects the INCLUDE list is ignored and this is a plain
+unique index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014_kits_code_covering_index'
+down_revision = '013_rename_kit_items_to_items'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create the covering index first so kits.code stays unique throughout
+    op.create_index(
+        'ix_kits_code_covering',
+        'kits',
+        ['code'],
+        unique=True,
+        postgresql_include=[
+            'id', 'name', 'description', 'status',
+            'current_custodian_id', 'current_custodian_name'
+        ]
+    )
+    op.drop_index('ix_kits_code', table_name='kits')
+
+
+def downgrade():
+    op.create_index('ix_kits_code', 'kits', ['code'], unique=True)
+    op.drop_index('ix_kits_code_covering', table_name='kits')
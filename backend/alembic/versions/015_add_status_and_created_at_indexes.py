@@ -0,0 +1,46 @@
+"""add partial kits.status index and custody_events.created_at index
+
+Revision ID: 015_add_status_and_created_at_indexes
+Revises: 014_kits_code_covering_index
+Create Date: 2026-02-03
+
+Adds indexes for audit and reporting queries:
+- kits.status, partial on checked_out/lost kits. Most kits are available, so
+  indexing only the minority statuses keeps the index small and leaves
+  writes to available kits untouched.
+- custody_events.created_at for the audit log export, which filters and
+  orders by creation date.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015_add_status_and_created_at_indexes'
+down_revision = '014_kits_code_covering_index'
+branch_labels = None
+depends_on = None
+
+
+ACTIVE_STATUS_PREDICATE = sa.text("status IN ('checked_out', 'lost')")
+
+
+def upgrade():
+    # Add partial index on kits.status for "checked out" and "lost" kit views
+    op.create_index(
+        'ix_kits_status_active',
+        'kits',
+        ['status'],
+        unique=False,
+        postgresql_where=ACTIVE_STATUS_PREDICATE,
+        sqlite_where=ACTIVE_STATUS_PREDICATE
+    )
+    
+    # Add index on custody_events.created_at for date-bounded, ordered exports
+    op.create_index('ix_custody_events_created_at', 'custody_events', ['created_at'], unique=False)
+
+
+def downgrade():
+    # Drop indexes in reverse order
+    op.drop_index('ix_custody_events_created_at', table_name='custody_events')
+    op.drop_index('ix_kits_status_active', table_name='kits')
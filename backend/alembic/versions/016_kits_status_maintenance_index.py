@@ -0,0 +1,27 @@
+"""add composite index on kits (status, next_maintenance_date)
+
+Revision ID: 016_kits_status_maintenance_index
+Revises: 015_add_status_and_created_at_indexes
+Create Date: 2026-02-04
+
+Supports the warnings scan, which selects checked-out kits and kits whose
+next_maintenance_date has passed (excluding kits in maintenance).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016_kits_status_maintenance_index'
+down_revision = '015_add_status_and_created_at_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add composite index on kits (status, next_maintenance_date) for overdue maintenance warnings
+    op.create_index('ix_kits_status_next_maintenance_date', 'kits', ['status', 'next_maintenance_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_kits_status_next_maintenance_date', table_name='kits')
@@ -0,0 +1,59 @@
+"""add unique index on users (oauth_provider, oauth_id)
+
+Revision ID: 017_users_oauth_identity_unique
+Revises: 016_kits_status_maintenance_index
+Create Date: 2026-02-05
+
+Enforces one user per OAuth identity and serves as the conflict target for
+the INSERT ... ON CONFLICT upsert used on login.
+
+Users created twice for the same identity (concurrent first logins) are not
+merged automatically: their ids are referenced from the append-only custody
+log and they may hold different roles. If any exist, the upgrade stops and
+lists them so an admin can resolve them by hand before rerunning it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '017_users_oauth_identity_unique'
+down_revision = '016_kits_status_maintenance_index'
+branch_labels = None
+depends_on = None
+
+
+# Users that share an OAuth identity with another user
+DUPLICATE_USERS = """
+    SELECT u.id, u.oauth_provider, u.oauth_id, u.email, u.role FROM users u
+    WHERE EXISTS (
+        SELECT 1 FROM users k
+        WHERE k.oauth_provider = u.oauth_provider AND k.oauth_id = u.oauth_id AND k.id <> u.id
+    )
+    ORDER BY u.oauth_provider, u.oauth_id, u.id
+"""
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(sa.text(DUPLICATE_USERS)).fetchall()
+    if duplicates:
+        listing = "\n".join(
+            f"  {provider}/{oauth_id}: user id={user_id} email={email} role={role}"
+            for user_id, provider, oauth_id, email, role in duplicates
+        )
+        raise RuntimeError(
+            "Cannot create unique index ix_users_oauth_provider_oauth_id: these users "
+            "share an OAuth identity. Resolve the duplicates by hand, then rerun the "
+            "migration.\n" + listing
+        )
+    
+    op.create_index(
+        'ix_users_oauth_provider_oauth_id',
+        'users',
+        ['oauth_provider', 'oauth_id'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_users_oauth_provider_oauth_id', table_name='users')
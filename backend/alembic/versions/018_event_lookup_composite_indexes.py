@@ -0,0 +1,34 @@
+"""add composite indexes for custody event and open maintenance lookups
+
+Revision ID: 018_event_lookup_composite_indexes
+Revises: 017_users_oauth_identity_unique
+Create Date: 2026-02-06
+
+kits.code, users.email, (users.oauth_provider, users.oauth_id) and
+custody_events.kit_id are already indexed. This adds the two composite
+lookups that were still scanning:
+- custody_events (event_type, created_at) for event-type history queries
+- maintenance_events (kit_id, is_open) for the open maintenance event check
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '018_event_lookup_composite_indexes'
+down_revision = '017_users_oauth_identity_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add composite index on custody_events (event_type, created_at) for event-type history
+    op.create_index('ix_custody_events_event_type_created_at', 'custody_events', ['event_type', 'created_at'], unique=False)
+    
+    # Add composite index on maintenance_events (kit_id, is_open) for open event lookups
+    op.create_index('ix_maintenance_events_kit_id_is_open', 'maintenance_events', ['kit_id', 'is_open'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_maintenance_events_kit_id_is_open', table_name='maintenance_events')
+    op.drop_index('ix_custody_events_event_type_created_at', table_name='custody_events')
@@ -4,20 +4,53 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.user_service import get_or_create_user
 from app.core.security import create_access_token, create_refresh_token, verify_token
+from app.core.security import StateSigner, SignatureExpired, BadSignature
 from app.schemas.user import UserResponse, Token
 from app.config import settings
 from app.models.user import User
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
+from cachetools import TTLCache
 from datetime import datetime, timezone
 from urllib.parse import urlencode
 import logging
 import requests
+import threading
+import time
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Create state serializer (uses SECRET_KEY for encryption and signing)
-state_serializer = URLSafeTimedSerializer(settings.SECRET_KEY)
+# Create state serializer (HMAC-SHA256 signed with a key derived from SECRET_KEY)
+state_serializer = StateSigner(settings.SECRET_KEY)
+
+# State tokens are accepted for 10 minutes after login starts
+STATE_MAX_AGE = 600
+
+# Short-lived cache of verified state tokens, so a retried or double-submitted
+# callback skips re-verifying the same token. Only tokens with at least the TTL
+# left before they expire are cached, so caching never extends STATE_MAX_AGE.
+_STATE_CACHE_TTL = 30
+_STATE_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=_STATE_CACHE_TTL)
+_STATE_CACHE_LOCK = threading.Lock()
+
+
+def load_state(state: str) -> dict:
+    """
+    Verify an OAuth state token and return its data.
+    
+    Raises:
+        SignatureExpired: If the token is older than STATE_MAX_AGE
+        BadSignature: If the token is malformed or its signature does not match
+    """
+    with _STATE_CACHE_LOCK:
+        cached = _STATE_CACHE.get(state)
+    if cached is not None:
+        return cached
+    
+    state_data, signed_at = state_serializer.loads(state, max_age=STATE_MAX_AGE, return_timestamp=True)
+    if time.time() - signed_at <= STATE_MAX_AGE - _STATE_CACHE_TTL:
+        with _STATE_CACHE_LOCK:
+            _STATE_CACHE[state] = state_data
+    return state_data
 
 # Google OAuth
 @router.get("/google/login")
@@ -63,8 +96,8 @@ async def google_callback(
         raise HTTPException(status_code=400, detail="Missing code or state parameter")
     
     try:
-        # Validate encrypted state (max_age=600 seconds = 10 minutes)
-        state_data = state_serializer.loads(state, max_age=600)
+        # Validate signed state (STATE_MAX_AGE = 10 minutes)
+        state_data = load_state(state)
         
         if state_data.get("provider") != "google":
             logger.error(f"Invalid provider in state: {state_data.get('provider')}")
@@ -194,8 +227,8 @@ async def microsoft_callback(
         raise HTTPException(status_code=400, detail="Missing code or state parameter")
     
     try:
-        # Validate encrypted state (max_age=600 seconds = 10 minutes)
-        state_data = state_serializer.loads(state, max_age=600)
+        # Validate signed state (STATE_MAX_AGE = 10 minutes)
+        state_data = load_state(state)
         
         if state_data.get("provider") != "microsoft":
             logger.error(f"Invalid provider in state: {state_data.get('provider')}")
@@ -285,7 +318,7 @@ async def microsoft_callback(
 
 # Get current user from JWT
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
+def get_current_user(request: Request, db: Session = Depends(get_db)):
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -306,7 +339,7 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
 
 # Refresh access token using refresh token
 @router.post("/refresh", response_model=Token)
-async def refresh_access_token(request: Request, db: Session = Depends(get_db)):
+def refresh_access_token(request: Request, db: Session = Depends(get_db)):
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import NO_LAZY_LOADS, get_db
 from app.models.user import User, UserRole
 from app.models.kit import Kit
 from app.schemas.custody_event import (
     CustodyCheckoutRequest,
     CustodyCheckoutResponse,
+    CustodyBulkCheckoutRequest,
+    CustodyBulkCheckoutResponse,
     CustodyEventResponse,
     CustodyTransferRequest,
     CustodyTransferResponse,
@@ -25,6 +27,7 @@ from app.schemas.approval_request import (
 )
 from app.services.custody_service import (
     checkout_kit_onprem,
+    checkout_kits_onprem,
     transfer_kit_custody,
     report_kit_lost,
     report_kit_found
@@ -36,7 +39,8 @@ from app.services.approval_service import (
 )
 from app.services.export_service import (
     export_custody_events_to_csv,
-    export_custody_events_to_json
+    export_custody_events_to_json,
+    stream_export
 )
 from app.constants import ATTESTATION_TEXT
 
@@ -46,7 +50,7 @@ router = APIRouter()
 # Dependency to get current user - simplified for now
 # SECURITY WARNING: This is mock authentication for development/testing only
 # TODO: Replace with real JWT authentication before production deployment
-async def get_current_user(db: Session = Depends(get_db)) -> User:
+def get_current_user(db: Session = Depends(get_db)) -> User:
     """
     Get current authenticated user.
     
@@ -116,6 +120,45 @@ def checkout_kit(
     )
 
 
+@router.post("/checkout/bulk", response_model=CustodyBulkCheckoutResponse, status_code=201)
+def checkout_kits_bulk(
+    request: CustodyBulkCheckoutRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Check out several kits on-premises in one request.
+    
+    Implements:
+    - CUSTODY-001 / QR-002 for batches of scans (e.g. a coach scanning kits in a row)
+    
+    This endpoint:
+    - Verifies the user has permission (Coach, Armorer, or Admin)
+    - Checks that every kit is available (all-or-nothing)
+    - Creates an immutable custody event per kit
+    - Updates each kit's status to checked_out
+    """
+    # Perform checkouts
+    results = checkout_kits_onprem(
+        db=db,
+        checkouts=request.checkouts,
+        initiated_by_user=current_user
+    )
+    
+    return CustodyBulkCheckoutResponse(
+        message=f"{len(results)} kit(s) successfully checked out",
+        checkouts=[
+            CustodyCheckoutResponse(
+                message=f"Kit '{kit.name}' successfully checked out to {custody_event.custodian_name}",
+                event=CustodyEventResponse.model_validate(custody_event),
+                kit_name=kit.name,
+                kit_code=kit.code
+            )
+            for custody_event, kit in results
+        ]
+    )
+
+
 @router.post("/transfer", response_model=CustodyTransferResponse, status_code=201)
 def transfer_kit(
     request: CustodyTransferRequest,
@@ -322,11 +365,17 @@ def list_pending_approvals(
         approver_user=current_user
     )
     
+    # Get kit details for all requests in one query
+    kit_ids = {approval_request.kit_id for approval_request in pending_requests}
+    kits_by_id = {}
+    if kit_ids:
+        kits = db.query(Kit).options(*NO_LAZY_LOADS).filter(Kit.id.in_(kit_ids)).all()
+        kits_by_id = {kit.id: kit for kit in kits}
+    
     # Build response list
     response_list = []
     for approval_request in pending_requests:
-        # Get kit details
-        kit = db.query(Kit).filter(Kit.id == approval_request.kit_id).first()
+        kit = kits_by_id[approval_request.kit_id]
         
         response_list.append(ApprovalRequestResponse(
             id=approval_request.id,
@@ -444,25 +493,19 @@ def export_custody_events(
     
     # Export based on format
     if format.lower() == "csv":
-        content = export_custody_events_to_csv(
-            db=db,
-            start_date=start_datetime,
-            end_date=end_datetime
-        )
+        export = export_custody_events_to_csv
         media_type = "text/csv"
         filename = f"custody_events_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     else:  # json
-        content = export_custody_events_to_json(
-            db=db,
-            start_date=start_datetime,
-            end_date=end_datetime
-        )
+        export = export_custody_events_to_json
         media_type = "application/json"
         filename = f"custody_events_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     
-    # Return file download response
-    return Response(
-        content=content,
+    # Return streaming file download response. Rows are read while the body streams,
+    # so the export gets its own session rather than the request's
+    content = stream_export(db.get_bind(), export, start_datetime, end_datetime)
+    return StreamingResponse(
+        content,
         media_type=media_type,
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select, func
 from typing import Optional, List
 from datetime import datetime
 
@@ -12,6 +12,53 @@ from app.schemas.custody_event import EventTimelineResponse, CustodyEventRespons
 
 router = APIRouter()
 
+# Columns backing CustodyEventResponse, selected as plain rows so the timeline query
+# skips ORM identity-map bookkeeping. The response_model still validates the payload once
+_EVENT_RESPONSE_COLUMNS = (
+    CustodyEvent.id,
+    CustodyEvent.event_type,
+    CustodyEvent.kit_id,
+    CustodyEvent.initiated_by_id,
+    CustodyEvent.initiated_by_name,
+    CustodyEvent.custodian_id,
+    CustodyEvent.custodian_name,
+    CustodyEvent.approved_by_id,
+    CustodyEvent.approved_by_name,
+    CustodyEvent.notes,
+    CustodyEvent.location_type,
+    CustodyEvent.expected_return_date,
+    CustodyEvent.attestation_text,
+    CustodyEvent.attestation_signature,
+    CustodyEvent.attestation_timestamp,
+    CustodyEvent.attestation_ip_address,
+    CustodyEvent.created_at,
+)
+
+
+def _fetch_event_responses(db: Session, criteria: list, sort_order: str, skip: int, limit: int):
+    """
+    Count and fetch a page of custody events matching the given criteria.
+    
+    Returns:
+        Tuple of (list of CustodyEventResponse, total count before pagination)
+    """
+    total = db.scalar(select(func.count()).select_from(CustodyEvent).where(*criteria))
+    
+    order_by = CustodyEvent.created_at.asc() if sort_order == "asc" else CustodyEvent.created_at.desc()
+    stmt = (
+        select(*_EVENT_RESPONSE_COLUMNS)
+        .where(*criteria)
+        .order_by(order_by)
+        .offset(skip)
+        .limit(limit)
+    )
+    
+    event_responses = [
+        CustodyEventResponse.model_construct(**row._mapping)
+        for row in db.execute(stmt)
+    ]
+    return event_responses, total
+
 
 @router.get("/kit/{kit_id}", response_model=EventTimelineResponse)
 def get_kit_events(
@@ -43,35 +90,23 @@ def get_kit_events(
     - Supports filtering and sorting
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
-    # Build query
-    query = db.query(CustodyEvent).filter(CustodyEvent.kit_id == kit_id)
+    # Build filter criteria
+    criteria = [CustodyEvent.kit_id == kit_id]
     
     # Apply filters
     if event_type:
-        query = query.filter(CustodyEvent.event_type == event_type)
+        criteria.append(CustodyEvent.event_type == event_type)
     if start_date:
-        query = query.filter(CustodyEvent.created_at >= start_date)
+        criteria.append(CustodyEvent.created_at >= start_date)
     if end_date:
-        query = query.filter(CustodyEvent.created_at <= end_date)
-    
-    # Get total count before pagination
-    total = query.count()
-    
-    # Apply sorting
-    if sort_order == "asc":
-        query = query.order_by(CustodyEvent.created_at.asc())
-    else:
-        query = query.order_by(CustodyEvent.created_at.desc())
-    
-    # Apply pagination
-    events = query.offset(skip).limit(limit).all()
+        criteria.append(CustodyEvent.created_at <= end_date)
     
-    # Convert to response models
-    event_responses = [CustodyEventResponse.model_validate(event) for event in events]
+    # Count, sort, paginate and convert to response models
+    event_responses, total = _fetch_event_responses(db, criteria, sort_order, skip, limit)
     
     return EventTimelineResponse(
         events=event_responses,
@@ -114,40 +149,28 @@ def get_user_events(
     - Supports filtering and sorting
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Build query - include events where user was initiator OR custodian
-    query = db.query(CustodyEvent).filter(
+    # Build filter criteria - include events where user was initiator OR custodian
+    criteria = [
         or_(
             CustodyEvent.initiated_by_id == user_id,
             CustodyEvent.custodian_id == user_id
         )
-    )
+    ]
     
     # Apply filters
     if event_type:
-        query = query.filter(CustodyEvent.event_type == event_type)
+        criteria.append(CustodyEvent.event_type == event_type)
     if start_date:
-        query = query.filter(CustodyEvent.created_at >= start_date)
+        criteria.append(CustodyEvent.created_at >= start_date)
     if end_date:
-        query = query.filter(CustodyEvent.created_at <= end_date)
-    
-    # Get total count before pagination
-    total = query.count()
-    
-    # Apply sorting
-    if sort_order == "asc":
-        query = query.order_by(CustodyEvent.created_at.asc())
-    else:
-        query = query.order_by(CustodyEvent.created_at.desc())
-    
-    # Apply pagination
-    events = query.offset(skip).limit(limit).all()
+        criteria.append(CustodyEvent.created_at <= end_date)
     
-    # Convert to response models
-    event_responses = [CustodyEventResponse.model_validate(event) for event in events]
+    # Count, sort, paginate and convert to response models
+    event_responses, total = _fetch_event_responses(db, criteria, sort_order, skip, limit)
     
     return EventTimelineResponse(
         events=event_responses,
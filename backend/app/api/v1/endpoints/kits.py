@@ -2,14 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Literal
+from datetime import date
 
-from app.database import get_db
-from app.models.kit import Kit
+from app.database import NO_LAZY_LOADS, get_db
+from app.models.kit import Kit, KitStatus
 from app.models.kit_item import Item, ItemStatus  # Use Item instead of KitItem
-from app.schemas.kit import KitCreate, KitResponse
+from app.schemas.kit import KitCreate, KitLookupResponse, KitResponse
 from app.schemas.kit_item import KitItemCreate, KitItemUpdate, KitItemResponse
+from app.services.kit_service import KitService
 from app.services.qr_service import create_qr_image
-from app.services.warnings_service import calculate_kit_warnings
+from app.services.warnings_service import build_kit_warnings, calculate_kit_warnings, get_latest_checkouts
 
 router = APIRouter()
 
@@ -21,8 +23,8 @@ def create_kit(kit_data: KitCreate, db: Session = Depends(get_db)):
     This implements QR-001: Register new kits and generate QR codes.
     """
     # Check if code already exists
-    existing = db.query(Kit).filter(Kit.code == kit_data.code).first()
-    if existing:
+    code_taken = db.query(db.query(Kit).filter(Kit.code == kit_data.code).exists()).scalar()
+    if code_taken:
         raise HTTPException(status_code=400, detail=f"Kit with code '{kit_data.code}' already exists")
     
     # Create kit
@@ -53,49 +55,76 @@ def list_kits(
     - Calculates soft warnings for overdue maintenance
     - Warnings are non-blocking and informational only
     """
-    kits = db.query(Kit).offset(skip).limit(limit).all()
+    kits = db.query(Kit).options(*NO_LAZY_LOADS).offset(skip).limit(limit).all()
     
-    # Add warning information to each kit
+    # Load latest checkouts for the whole page in one query
+    latest_checkouts = get_latest_checkouts(
+        db, (kit.id for kit in kits if kit.status == KitStatus.checked_out)
+    )
+    
+    # Decrypt the page's serial numbers in one batch
+    serial_numbers = Kit.decrypt_serial_numbers(kits)
+    
+    # Add warning information to each kit, against a single reading of today's date
+    today = date.today()
     kit_responses = []
-    for kit in kits:
+    for kit, serial_number in zip(kits, serial_numbers):
         kit_dict = {
             "id": kit.id,
             "code": kit.code,
             "name": kit.name,
             "description": kit.description,
             "status": kit.status,
-            "serial_number": kit.serial_number,  # Will be decrypted by hybrid property
+            "serial_number": serial_number,
             "current_custodian_id": kit.current_custodian_id,
             "current_custodian_name": kit.current_custodian_name,
-            "serial_number": kit.serial_number,  # Automatically decrypted by EncryptedString type
             "next_maintenance_date": kit.next_maintenance_date,
             "created_at": kit.created_at,
             "updated_at": kit.updated_at
         }
         
         # Calculate warnings
-        warnings = calculate_kit_warnings(kit, db)
+        warnings = build_kit_warnings(kit, latest_checkouts.get(kit.id), today)
         kit_dict.update({
-            "has_warning": warnings["has_warning"],
-            "overdue_return": warnings["overdue_return"],
-            "extended_custody": warnings["extended_custody"],
-            "days_overdue": warnings["days_overdue"],
-            "days_checked_out": warnings["days_checked_out"],
-            "expected_return_date": warnings["expected_return_date"],
-            "overdue_maintenance": warnings["overdue_maintenance"],
-            "days_maintenance_overdue": warnings["days_maintenance_overdue"]
+            "has_warning": warnings.has_warning,
+            "overdue_return": warnings.overdue_return,
+            "extended_custody": warnings.extended_custody,
+            "days_overdue": warnings.days_overdue,
+            "days_checked_out": warnings.days_checked_out,
+            "expected_return_date": warnings.expected_return_date,
+            "overdue_maintenance": warnings.overdue_maintenance,
+            "days_maintenance_overdue": warnings.days_maintenance_overdue
         })
         
-        kit_responses.append(KitResponse(**kit_dict))
+        # Build from the prepared dict; the response_model validates the list once on the way out
+        kit_responses.append(KitResponse.model_construct(**kit_dict))
     
     return kit_responses
 
+@router.get("/lookup", response_model=KitLookupResponse)
+def lookup_kit(
+    code: str = Query(..., description="Kit code (scanned from QR or manually entered)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Look up a kit by code for QR scans and manual entry.
+    
+    Returns the kit's status and current custodian without serial number or
+    warning details. Backed by KitService.lookup_by_code, which reads from the
+    covering code index and caches repeated scans briefly.
+    """
+    kit = KitService.lookup_by_code(db, code)
+    if not kit:
+        raise HTTPException(status_code=404, detail=f"Kit with code '{code}' not found")
+    
+    return KitLookupResponse.model_validate(kit)
+
 @router.get("/{kit_id}", response_model=KitResponse)
 def get_kit(kit_id: int, db: Session = Depends(get_db)):
     """
     Get a specific kit by ID with warning information.
     """
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.query(Kit).options(*NO_LAZY_LOADS).filter(Kit.id == kit_id).first()
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -118,14 +147,14 @@ def get_kit(kit_id: int, db: Session = Depends(get_db)):
     # Calculate warnings
     warnings = calculate_kit_warnings(kit, db)
     kit_dict.update({
-        "has_warning": warnings["has_warning"],
-        "overdue_return": warnings["overdue_return"],
-        "extended_custody": warnings["extended_custody"],
-        "days_overdue": warnings["days_overdue"],
-        "days_checked_out": warnings["days_checked_out"],
-        "expected_return_date": warnings["expected_return_date"],
-        "overdue_maintenance": warnings["overdue_maintenance"],
-        "days_maintenance_overdue": warnings["days_maintenance_overdue"]
+        "has_warning": warnings.has_warning,
+        "overdue_return": warnings.overdue_return,
+        "extended_custody": warnings.extended_custody,
+        "days_overdue": warnings.days_overdue,
+        "days_checked_out": warnings.days_checked_out,
+        "expected_return_date": warnings.expected_return_date,
+        "overdue_maintenance": warnings.overdue_maintenance,
+        "days_maintenance_overdue": warnings.days_maintenance_overdue
     })
     
     return KitResponse(**kit_dict)
@@ -137,7 +166,7 @@ def get_kit_by_code(code: str, db: Session = Depends(get_db)):
     
     This supports QR-002 and QR-003: Scan QR code to check out/in kits.
     """
-    kit = db.query(Kit).filter(Kit.code == code).first()
+    kit = db.query(Kit).options(*NO_LAZY_LOADS).filter(Kit.code == code).first()
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -160,14 +189,14 @@ def get_kit_by_code(code: str, db: Session = Depends(get_db)):
     # Calculate warnings
     warnings = calculate_kit_warnings(kit, db)
     kit_dict.update({
-        "has_warning": warnings["has_warning"],
-        "overdue_return": warnings["overdue_return"],
-        "extended_custody": warnings["extended_custody"],
-        "days_overdue": warnings["days_overdue"],
-        "days_checked_out": warnings["days_checked_out"],
-        "expected_return_date": warnings["expected_return_date"],
-        "overdue_maintenance": warnings["overdue_maintenance"],
-        "days_maintenance_overdue": warnings["days_maintenance_overdue"]
+        "has_warning": warnings.has_warning,
+        "overdue_return": warnings.overdue_return,
+        "extended_custody": warnings.extended_custody,
+        "days_overdue": warnings.days_overdue,
+        "days_checked_out": warnings.days_checked_out,
+        "expected_return_date": warnings.expected_return_date,
+        "overdue_maintenance": warnings.overdue_maintenance,
+        "days_maintenance_overdue": warnings.days_maintenance_overdue
     })
     
     return KitResponse(**kit_dict)
@@ -183,7 +212,7 @@ def get_qr_image(
     
     This endpoint serves QR codes as images for printing or display.
     """
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -212,7 +241,7 @@ def list_kit_items(
     This enables viewing all components within a kit for granular inventory tracking.
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -237,7 +266,7 @@ def create_kit_item(
     The item is created and immediately assigned to the kit with 'assigned' status.
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -272,7 +301,7 @@ def get_kit_item(
     Get details of a specific item in a kit.
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -301,7 +330,7 @@ def update_kit_item(
     This enables modifying item details, swapping components, or updating status.
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
@@ -338,7 +367,7 @@ def delete_kit_item(
     The item is completely deleted from the database.
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
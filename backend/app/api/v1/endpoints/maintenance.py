@@ -21,7 +21,7 @@ router = APIRouter()
 # Dependency to get current user - using same mock as custody endpoints
 # SECURITY WARNING: This is mock authentication for development/testing only
 # TODO: Replace with real JWT authentication before production deployment
-async def get_current_user(db: Session = Depends(get_db)) -> User:
+def get_current_user(db: Session = Depends(get_db)) -> User:
     """
     Get current authenticated user.
     
@@ -136,7 +136,7 @@ def get_kit_maintenance_history(
     ordered by creation date (most recent first).
     """
     # Verify kit exists
-    kit = db.query(Kit).filter(Kit.id == kit_id).first()
+    kit = db.get(Kit, kit_id)
     if not kit:
         raise HTTPException(status_code=404, detail="Kit not found")
     
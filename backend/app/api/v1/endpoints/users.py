@@ -35,7 +35,7 @@ def verify_admin(user: User):
         raise HTTPException(status_code=403, detail="Admin access required")
 
 @router.get("/", response_model=List[UserResponse])
-async def list_users(
+def list_users(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -46,7 +46,7 @@ async def list_users(
     return users
 
 @router.patch("/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
@@ -56,7 +56,7 @@ async def update_user(
     verify_admin(current_user)
     
     # Find the user to update
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
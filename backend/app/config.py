@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from functools import cached_property
+from typing import List, Tuple
 import secrets
 import os
 import base64
@@ -16,6 +17,11 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql://localhost/custody_manager"
+    # Connection pool (ignored for SQLite)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 3600  # Seconds before a connection is replaced
     
     # Security
     SECRET_KEY: str = ""  # Must be set via environment variable
@@ -49,8 +55,9 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
     
-    def get_cors_origins(self) -> List[str]:
-        """Build comprehensive CORS origins list including frontend URL and development URLs."""
+    @cached_property
+    def cors_origins(self) -> Tuple[str, ...]:
+        """CORS origins including frontend URL and development URLs, built once per Settings."""
         # Start with base development origins
         allowed_origins = [
             "http://localhost:5173",  # Vite dev server
@@ -71,7 +78,11 @@ class Settings(BaseSettings):
         allowed_origins = [origin for origin in allowed_origins if origin]
         
         logger.info(f"CORS allowed origins: {allowed_origins}")
-        return allowed_origins
+        return tuple(allowed_origins)
+    
+    def get_cors_origins(self) -> List[str]:
+        """Build comprehensive CORS origins list including frontend URL and development URLs."""
+        return list(self.cors_origins)
     
     def get_microsoft_metadata_url(self) -> str:
         """Get Microsoft OAuth metadata URL with validated tenant ID."""
@@ -80,24 +91,38 @@ class Settings(BaseSettings):
     
     def validate_secret_key(self) -> None:
         """Validate that SECRET_KEY is properly configured for OAuth session security."""
-        if not self.SECRET_KEY:
-            # For development, auto-generate but warn
-            if self.ENVIRONMENT == "development":
-                self.SECRET_KEY = secrets.token_urlsafe(32)
-                logger.warning("Using auto-generated SECRET_KEY for development. Set SECRET_KEY in .env for production.")
-            else:
-                raise ValueError(
-                    "SECRET_KEY must be set in environment variables for production. "
-                    "OAuth session management requires a persistent SECRET_KEY. "
-                    "Generate one with: python -c 'import secrets; print(secrets.token_urlsafe(32))'"
-                )
-        
-        # Validate minimum length (32 characters recommended)
-        if len(self.SECRET_KEY) < 32:
+        self.SECRET_KEY = check_secret_key(self.SECRET_KEY, self.ENVIRONMENT)
+
+
+def check_secret_key(secret_key: str, environment: str) -> str:
+    """
+    Check a SECRET_KEY value without building Settings.
+    
+    Returns the key to use: the given key, or a generated one in development
+    when none is set. Raises ValueError if the key is missing outside
+    development or shorter than 32 characters.
+    """
+    if not secret_key:
+        # For development, auto-generate but warn
+        if environment == "development":
+            secret_key = secrets.token_urlsafe(32)
+            logger.warning("Using auto-generated SECRET_KEY for development. Set SECRET_KEY in .env for production.")
+        else:
             raise ValueError(
-                f"SECRET_KEY must be at least 32 characters long (current: {len(self.SECRET_KEY)}). "
-                "Generate a secure key with: python -c 'import secrets; print(secrets.token_urlsafe(32))'"
+                "SECRET_KEY must be set in environment variables for production. "
+                "OAuth session management requires a persistent SECRET_KEY. "
+                "Generate one with: python -c 'import secrets; print(secrets.token_urlsafe(32))'"
             )
+    
+    # Validate minimum length (32 characters recommended)
+    if len(secret_key) < 32:
+        raise ValueError(
+            f"SECRET_KEY must be at least 32 characters long (current: {len(secret_key)}). "
+            "Generate a secure key with: python -c 'import secrets; print(secrets.token_urlsafe(32))'"
+        )
+    
+    return secret_key
+
 
 settings = Settings()
 # Validate SECRET_KEY on startup
@@ -3,21 +3,44 @@ Field-level encryption utilities for sensitive data.
 
 This module implements AES-256 encryption for database fields to protect
 sensitive information like serial numbers (AUDIT-003).
+
+New values are sealed with AES-256-GCM. Values written earlier as Fernet
+tokens are still decrypted, so existing rows keep working without a
+re-encryption migration.
 """
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 from sqlalchemy import TypeDecorator, String
-from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from app.config import settings
 import base64
+import binascii
 import hashlib
+import os
+
+# Leading byte of an AES-GCM value; Fernet tokens always start with 0x80
+_AESGCM_VERSION = b"\x01"
+_FERNET_VERSION = b"\x80"
+_NONCE_SIZE = 12
+# HKDF label for the AES-GCM key, so it never equals Fernet's signing/encryption keys
+_AESGCM_KEY_INFO = b"field-cipher-aesgcm-v1"
+_TAG_SIZE = 16
+# Shortest Fernet token: version, timestamp, IV, one AES block and the HMAC
+_MIN_FERNET_SIZE = 1 + 8 + 16 + 16 + 32
 
 
+@lru_cache(maxsize=1)
 def get_fernet_key() -> bytes:
     """
     Derive a valid Fernet key from the encryption key in settings.
     
     Fernet requires a 32-byte URL-safe base64-encoded key.
     This function ensures the key from settings is converted to the proper format.
+    The key is derived once and cached for the life of the process.
     """
     # Use the encryption key from settings
     key_material = settings.ENCRYPTION_KEY.encode()
@@ -31,6 +54,79 @@ def get_fernet_key() -> bytes:
     return fernet_key
 
 
+class FieldCipher:
+    """
+    AES-256-GCM cipher for field values that can still read Fernet tokens.
+    
+    Mirrors Fernet's bytes-in/bytes-out interface. Encrypted values are
+    URL-safe base64 of a version byte, a random 12-byte nonce and the GCM
+    ciphertext with its tag. Any value that fails to decrypt raises
+    cryptography.fernet.InvalidToken, whichever format it claims to be.
+    """
+    
+    def __init__(self, key: bytes):
+        """
+        Initialize the cipher.
+        
+        Args:
+            key: 32-byte URL-safe base64-encoded key, as used by Fernet
+        
+        The Fernet key is used as-is to read legacy tokens. The AES-GCM key is
+        derived from it with HKDF-SHA256, so the two ciphers never share a key.
+        """
+        aesgcm_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=_AESGCM_KEY_INFO
+        ).derive(base64.urlsafe_b64decode(key))
+        self._aesgcm = AESGCM(aesgcm_key)
+        self._fernet = Fernet(key)
+    
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypt data with AES-256-GCM under a fresh random nonce."""
+        nonce = os.urandom(_NONCE_SIZE)
+        return base64.urlsafe_b64encode(
+            _AESGCM_VERSION + nonce + self._aesgcm.encrypt(nonce, data, None)
+        )
+    
+    def decrypt(self, token: bytes) -> bytes:
+        """Decrypt an AES-GCM value, or a Fernet token written before AES-GCM."""
+        try:
+            raw = base64.urlsafe_b64decode(token)
+        except (TypeError, binascii.Error):
+            raise InvalidToken
+        
+        if raw[:1] == _AESGCM_VERSION and len(raw) > 1 + _NONCE_SIZE:
+            try:
+                return self._aesgcm.decrypt(raw[1:1 + _NONCE_SIZE], raw[1 + _NONCE_SIZE:], None)
+            except InvalidTag:
+                raise InvalidToken
+        
+        return self._fernet.decrypt(token)
+    
+    def is_ciphertext(self, token: bytes) -> bool:
+        """
+        Check whether a value has the shape of a value this cipher produced.
+        
+        Only the encoding, version byte and length are checked, so this is
+        cheap but does not authenticate the value; use decrypt for that.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token)
+        except (TypeError, binascii.Error):
+            return False
+        
+        if raw[:1] == _AESGCM_VERSION:
+            return len(raw) >= 1 + _NONCE_SIZE + _TAG_SIZE
+        return raw[:1] == _FERNET_VERSION and len(raw) >= _MIN_FERNET_SIZE
+
+
+# Shared cipher for every EncryptedString column, so encrypting or decrypting
+# a row never rebuilds the key or the cipher
+_CIPHER = FieldCipher(get_fernet_key())
+
+
 class EncryptedString(TypeDecorator):
     """
     SQLAlchemy custom type for encrypted string fields.
@@ -38,7 +134,7 @@ class EncryptedString(TypeDecorator):
     This type automatically encrypts data before storing in the database
     and decrypts it when reading from the database.
     
-    Uses AES-256 encryption via the Fernet symmetric encryption scheme.
+    Uses AES-256-GCM via FieldCipher.
     """
     impl = String
     cache_ok = True
@@ -52,14 +148,11 @@ class EncryptedString(TypeDecorator):
                    Should be larger than plaintext to account for encryption overhead.
         """
         super().__init__(length=length)
-        self._fernet = None
     
     @property
-    def fernet(self) -> Fernet:
-        """Lazy initialization of Fernet cipher."""
-        if self._fernet is None:
-            self._fernet = Fernet(get_fernet_key())
-        return self._fernet
+    def cipher(self) -> FieldCipher:
+        """Cipher shared by all encrypted columns."""
+        return _CIPHER
     
     def process_bind_param(self, value: Optional[str], dialect) -> Optional[str]:
         """
@@ -75,11 +168,8 @@ class EncryptedString(TypeDecorator):
         if value is None:
             return None
         
-        # Encrypt the value
-        encrypted_bytes = self.fernet.encrypt(value.encode())
-        
-        # Return as string for database storage
-        return encrypted_bytes.decode()
+        # Encrypt the value and return as string for database storage
+        return _CIPHER.encrypt(value.encode()).decode()
     
     def process_result_value(self, value: Optional[str], dialect) -> Optional[str]:
         """
@@ -95,30 +185,38 @@ class EncryptedString(TypeDecorator):
         if value is None:
             return None
         
-        # Decrypt the value
-        decrypted_bytes = self.fernet.decrypt(value.encode())
-        
-        # Return as string
-        return decrypted_bytes.decode()
+        # Decrypt the value and return as string
+        return _CIPHER.decrypt(value.encode()).decode()
 
 
 class FieldEncryption:
     """
     Handles field-level encryption for sensitive database fields.
-    Uses Fernet (symmetric encryption) from the cryptography library.
+    Uses AES-256-GCM via FieldCipher, reading older Fernet tokens as well.
+    
+    Instances are shared per key: constructing FieldEncryption again with the
+    same ENCRYPTION_KEY returns the existing instance and its cipher.
     """
     
-    def __init__(self):
-        """Initialize encryption with the configured key."""
+    _instances: Dict[bytes, "FieldEncryption"] = {}
+    
+    def __new__(cls):
+        """Return the instance for the configured key, creating it on first use."""
         # Ensure the encryption key is properly formatted
         key = settings.ENCRYPTION_KEY.encode() if isinstance(settings.ENCRYPTION_KEY, str) else settings.ENCRYPTION_KEY
         
-        # Fernet requires a 32-byte base64-encoded key
+        # The cipher requires a 32-byte base64-encoded key
         if len(key) != 44:  # base64 encoded 32 bytes = 44 chars
             # Pad or derive key to correct length
             key = base64.urlsafe_b64encode(key.ljust(32, b'\0')[:32])
         
-        self._cipher = Fernet(key)
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._cipher = FieldCipher(key)
+            # setdefault keeps one instance if two threads race on first use
+            instance = cls._instances.setdefault(key, instance)
+        return instance
     
     def encrypt(self, plaintext: Optional[str]) -> Optional[str]:
         """
@@ -153,6 +251,37 @@ class FieldEncryption:
         # Convert to bytes, decrypt, and return as string
         decrypted_bytes = self._cipher.decrypt(ciphertext.encode('utf-8'))
         return decrypted_bytes.decode('utf-8')
+    
+    def decrypt_many(self, ciphertexts: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Decrypt a batch of encrypted string values.
+        
+        Args:
+            ciphertexts: Encrypted strings to decrypt; None entries are kept
+            
+        Returns:
+            Decrypted plaintext strings, in the same order as ciphertexts
+        """
+        decrypt = self._cipher.decrypt
+        return [
+            None if ciphertext is None else decrypt(ciphertext.encode('utf-8')).decode('utf-8')
+            for ciphertext in ciphertexts
+        ]
+    
+    def is_ciphertext(self, value: Optional[str]) -> bool:
+        """
+        Check whether a stored value looks like an encrypted field value.
+        
+        Args:
+            value: The value to check
+            
+        Returns:
+            True if value has the format produced by encrypt, False otherwise
+        """
+        if value is None:
+            return False
+        
+        return self._cipher.is_ciphertext(value.encode('utf-8'))
 
 
 # Global instance for use throughout the application
@@ -167,3 +296,8 @@ def encrypt_field(value: Optional[str]) -> Optional[str]:
 def decrypt_field(value: Optional[str]) -> Optional[str]:
     """Convenience function to decrypt a field value."""
     return field_encryption.decrypt(value)
+
+
+def decrypt_fields(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Convenience function to decrypt a batch of field values."""
+    return field_encryption.decrypt_many(values)
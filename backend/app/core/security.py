@@ -1,11 +1,24 @@
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import threading
+import time
+from cachetools import TTLCache
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Short-lived cache of verified token claims, so clients re-sending the same token
+# skip the signature check. Each hit re-checks the token's own expiry.
+_VERIFIED_TOKEN_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=60)
+_VERIFIED_TOKEN_CACHE_LOCK = threading.Lock()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -29,8 +42,84 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str):
+    with _VERIFIED_TOKEN_CACHE_LOCK:
+        payload = _VERIFIED_TOKEN_CACHE.get(token)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return dict(payload)
+        with _VERIFIED_TOKEN_CACHE_LOCK:
+            _VERIFIED_TOKEN_CACHE.pop(token, None)
+        return None
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    with _VERIFIED_TOKEN_CACHE_LOCK:
+        _VERIFIED_TOKEN_CACHE[token] = payload
+    return dict(payload)
+
+
+class BadSignature(Exception):
+    """Raised when a signed token is malformed or its signature does not match"""
+
+
+class SignatureExpired(BadSignature):
+    """Raised when a signed token is older than the allowed max_age"""
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class StateSigner:
+    """
+    Sign and verify short-lived JSON payloads such as OAuth state tokens.
+    
+    Tokens are base64url(JSON) "." base64url(timestamp + MAC), where the timestamp
+    is a big-endian uint32 of Unix seconds and the MAC is HMAC-SHA256 over the
+    payload and timestamp, truncated to 128 bits.
+    """
+    MAC_SIZE = 16
+    
+    def __init__(self, secret_key: str, salt: bytes = b"oauth-state"):
+        # Derive a separate key so state tokens cannot be confused with other signed values
+        self._key = hmac.new(secret_key.encode("utf-8"), salt, hashlib.sha256).digest()
+    
+    def _mac(self, payload: bytes, timestamp: bytes) -> bytes:
+        return hmac.new(self._key, payload + b"." + timestamp, hashlib.sha256).digest()[:self.MAC_SIZE]
+    
+    def dumps(self, obj: Any) -> str:
+        payload = _b64encode(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+        timestamp = struct.pack(">I", int(time.time()))
+        return (payload + b"." + _b64encode(timestamp + self._mac(payload, timestamp))).decode("ascii")
+    
+    def loads(self, token: str, max_age: Optional[int] = None, return_timestamp: bool = False) -> Any:
+        try:
+            payload, signature = token.encode("ascii").rsplit(b".", 1)
+            signature = _b64decode(signature)
+        except ValueError:
+            raise BadSignature("Malformed token")
+        if len(signature) != 4 + self.MAC_SIZE:
+            raise BadSignature("Malformed token")
+        
+        timestamp, mac = signature[:4], signature[4:]
+        if not hmac.compare_digest(mac, self._mac(payload, timestamp)):
+            raise BadSignature("Signature does not match")
+        
+        signed_at = struct.unpack(">I", timestamp)[0]
+        if max_age is not None:
+            age = int(time.time()) - signed_at
+            if age > max_age or age < 0:
+                raise SignatureExpired(f"Signature age {age} is outside max_age {max_age}")
+        
+        try:
+            obj = json.loads(_b64decode(payload))
+        except ValueError:
+            raise BadSignature("Malformed payload")
+        return (obj, signed_at) if return_timestamp else obj
@@ -1,20 +1,40 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import raiseload, sessionmaker
 from app.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+# Size the pool for concurrent requests; SQLite uses its own pool classes, which
+# don't take these options
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    pool_options = {}
+else:
+    pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **pool_options
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Keep loaded attributes after commit so services don't pay a SELECT per object
+# to re-read values they just wrote
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
+# Loader options for hot paths that should never lazy-load relationships. In debug
+# mode an unexpected lazy load raises, so N+1 regressions surface during
+# development instead of silently adding queries; in production this is a no-op.
+NO_LAZY_LOADS = (raiseload("*"),) if settings.DEBUG else ()
+
 # Dependency
 def get_db():
     db = SessionLocal()
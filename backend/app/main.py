@@ -27,7 +27,7 @@ app.add_middleware(
 # CORS middleware - Allow frontend requests including preflight
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.get_cors_origins(),
+    allow_origins=settings.cors_origins,
     allow_credentials=True,  # Required for Authorization header and cookies
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # Explicitly include OPTIONS
     allow_headers=["*"],  # Allow all headers including Authorization
@@ -4,6 +4,9 @@ from app.database import Base
 
 class BaseModel(Base):
     __abstract__ = True
+    # Fetch server-generated columns (id, created_at, updated_at) with RETURNING on
+    # INSERT/UPDATE, so callers don't need to refresh objects after a flush
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, String, Integer, Enum as SQLEnum, Date
+from sqlalchemy import Column, String, Integer, Enum as SQLEnum, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from app.models.base import BaseModel
 from app.core.encryption import EncryptedString
-from app.core.encryption import encrypt_field, decrypt_field
+from app.core.encryption import encrypt_field, decrypt_field, decrypt_fields
 import enum
 
 class KitStatus(str, enum.Enum):
@@ -15,9 +15,24 @@ class KitStatus(str, enum.Enum):
 
 class Kit(BaseModel):
     __tablename__ = "kits"
+    __table_args__ = (
+        # Unique index on code that also carries the kit details read by QR lookups.
+        # The timestamps are left out: updated_at changes on every kit write, and
+        # including it would rewrite this index entry on every custody change
+        Index(
+            "ix_kits_code_covering",
+            "code",
+            unique=True,
+            postgresql_include=[
+                "id", "name", "description", "status",
+                "current_custodian_id", "current_custodian_name"
+            ]
+        ),
+    )
     
     # Kit code (unique alphanumeric identifier, not exposing serial numbers per QR-004)
-    code = Column(String(50), unique=True, nullable=False, index=True)
+    # Uniqueness is enforced by ix_kits_code_covering above
+    code = Column(String(50), nullable=False)
     name = Column(String(200), nullable=False)
     description = Column(String(500))
     status = Column(SQLEnum(KitStatus), default=KitStatus.available, nullable=False)
@@ -60,4 +75,8 @@ class Kit(BaseModel):
     def serial_number(self, value):
         """Encrypt serial number when set."""
         self._serial_number_encrypted = encrypt_field(value)
-
+    
+    @staticmethod
+    def decrypt_serial_numbers(kits):
+        """Decrypt the serial numbers of several kits in one batch."""
+        return decrypt_fields([kit._serial_number_encrypted for kit in kits])
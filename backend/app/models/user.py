@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Boolean, Enum as SQLEnum, Index
 from app.models.base import BaseModel
 import enum
 
@@ -31,6 +31,10 @@ class User(BaseModel):
         updated_at (datetime): Timestamp when user was last updated (inherited from BaseModel)
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # One user per OAuth identity; also the conflict target for get_or_create_user
+        Index("ix_users_oauth_provider_oauth_id", "oauth_provider", "oauth_id", unique=True),
+    )
     
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
@@ -41,6 +41,23 @@ class CustodyCheckoutResponse(BaseModel):
     kit_name: str
     kit_code: str
 
+# Upper bound on kits per bulk checkout, keeping the single UPDATE/INSERT statements bounded
+MAX_BULK_CHECKOUTS = 100
+
+class CustodyBulkCheckoutRequest(BaseModel):
+    """Request schema for checking out several kits at once (e.g. buffered QR scans)"""
+    checkouts: List[CustodyCheckoutRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BULK_CHECKOUTS,
+        description=f"Kits to check out (at most {MAX_BULK_CHECKOUTS})"
+    )
+
+class CustodyBulkCheckoutResponse(BaseModel):
+    """Response schema for successful bulk checkout"""
+    message: str
+    checkouts: List[CustodyCheckoutResponse]
+
 class CustodyTransferRequest(BaseModel):
     """Request schema for transferring custody of a kit"""
     kit_code: str = Field(..., description="Kit code (scanned from QR or manually entered)")
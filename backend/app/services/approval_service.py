@@ -2,16 +2,25 @@
 Approval service - handles off-site checkout approval logic
 """
 
+from sqlalchemy import lambda_stmt, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, Request
 from typing import Optional, List
 from datetime import datetime, timezone, date
 
+from app.database import NO_LAZY_LOADS
 from app.models.approval_request import ApprovalRequest, ApprovalStatus
 from app.models.custody_event import CustodyEvent, CustodyEventType
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
 from app.constants import ATTESTATION_TEXT
+from app.services.kit_service import KitService
+
+# Roles allowed to view and decide off-site checkout requests
+_APPROVER_ROLES = frozenset((UserRole.armorer, UserRole.coach, UserRole.admin))
+
+# Note recorded on the custody event when an off-site request is approved
+APPROVAL_NOTE_TEMPLATE = "Approved by {approver_name} ({approver_role}). {notes}"
 
 
 def create_offsite_checkout_request(
@@ -72,7 +81,7 @@ def create_offsite_checkout_request(
         )
     
     # Find kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
+    kit = db.scalars(lambda_stmt(lambda: select(Kit).where(Kit.code == kit_code))).first()
     if not kit:
         raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
     
@@ -84,12 +93,12 @@ def create_offsite_checkout_request(
         )
     
     # Check if there's already a pending approval request for this kit
-    existing_request = db.query(ApprovalRequest).filter(
+    has_pending_request = db.query(db.query(ApprovalRequest).filter(
         ApprovalRequest.kit_id == kit.id,
         ApprovalRequest.status == ApprovalStatus.pending
-    ).first()
+    ).exists()).scalar()
     
-    if existing_request:
+    if has_pending_request:
         raise HTTPException(
             status_code=400,
             detail=f"There is already a pending approval request for this kit"
@@ -149,8 +158,7 @@ def approve_or_deny_offsite_request(
         HTTPException: If request not found, already processed, or user lacks permission
     """
     # Verify permissions - only Armorer or Coach can approve/deny
-    allowed_roles = [UserRole.armorer, UserRole.coach, UserRole.admin]
-    if approver_user.role not in allowed_roles:
+    if approver_user.role not in _APPROVER_ROLES:
         raise HTTPException(
             status_code=403,
             detail=f"Only Armorer or Coach can approve/deny off-site checkout requests"
@@ -175,7 +183,7 @@ def approve_or_deny_offsite_request(
         )
     
     # Get the kit
-    kit = db.query(Kit).filter(Kit.id == approval_request.kit_id).first()
+    kit = db.get(Kit, approval_request.kit_id)
     if not kit:
         raise HTTPException(
             status_code=404,
@@ -192,6 +200,23 @@ def approve_or_deny_offsite_request(
                 detail=f"Kit is no longer available (current status: {kit.status})"
             )
         
+        # Update kit status in a single UPDATE; the WHERE clause re-checks availability
+        # so a checkout that lands after the check above can't be overwritten
+        kit_stmt = (
+            update(Kit)
+            .where(Kit.id == kit.id, Kit.status == KitStatus.available)
+            .values(
+                status=KitStatus.checked_out,
+                current_custodian_id=approval_request.custodian_id,
+                current_custodian_name=approval_request.custodian_name
+            )
+            .returning(Kit)
+            .options(*NO_LAZY_LOADS)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        if db.scalars(kit_stmt).first() is None:
+            raise HTTPException(status_code=400, detail="Kit is no longer available")
+        
         # Update approval request
         approval_request.status = ApprovalStatus.approved
         approval_request.approver_id = approver_user.id
@@ -206,16 +231,15 @@ def approve_or_deny_offsite_request(
             initiated_by_name=approval_request.requester_name,
             custodian_id=approval_request.custodian_id,
             custodian_name=approval_request.custodian_name,
-            notes=f"Approved by {approver_user.name} ({approver_user.role}). " + (approval_request.notes or ""),
+            notes=APPROVAL_NOTE_TEMPLATE.format(
+                approver_name=approver_user.name,
+                approver_role=approver_user.role,
+                notes=approval_request.notes or ""
+            ),
             location_type="off_site",
             expected_return_date=approval_request.expected_return_date
         )
         
-        # Update kit status
-        kit.status = KitStatus.checked_out
-        kit.current_custodian_id = approval_request.custodian_id
-        kit.current_custodian_name = approval_request.custodian_name
-        
         db.add(custody_event)
     else:
         # Deny the request
@@ -236,8 +260,8 @@ def approve_or_deny_offsite_request(
     db.refresh(approval_request)
     
     if custody_event:
+        KitService.invalidate_lookup(kit.code)
         db.refresh(custody_event)
-        db.refresh(kit)
     
     return approval_request, custody_event, kit
 
@@ -260,8 +284,7 @@ def get_pending_approvals(
         HTTPException: If user lacks permission
     """
     # Verify permissions - only Armorer or Coach can see pending approvals
-    allowed_roles = [UserRole.armorer, UserRole.coach, UserRole.admin]
-    if approver_user.role not in allowed_roles:
+    if approver_user.role not in _APPROVER_ROLES:
         raise HTTPException(
             status_code=403,
             detail=f"Only Armorer or Coach can view pending approvals"
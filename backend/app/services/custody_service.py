@@ -2,14 +2,120 @@
 Custody service - handles custody event logic and validation
 """
 
+from sqlalchemy import Integer, bindparam, case, cast, insert, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
+from app.database import NO_LAZY_LOADS
 from app.models.custody_event import CustodyEvent, CustodyEventType
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
+from app.schemas.custody_event import CustodyCheckoutRequest
+from app.services.kit_service import KitService
+
+
+# Number of custody events written per INSERT statement by bulk_record_events
+EVENT_BATCH_SIZE = 1000
+
+
+# Roles allowed to perform each custody operation
+_CHECKOUT_ROLES = frozenset((UserRole.coach, UserRole.armorer, UserRole.admin))
+_ARMORER_ROLES = frozenset((UserRole.armorer, UserRole.admin))
+
+# 403 details, formatted once (joined from fixed tuples so the role order is stable)
+_CHECKOUT_ROLE_NAMES = ", ".join(r.value for r in (UserRole.coach, UserRole.armorer, UserRole.admin))
+_ARMORER_ROLE_NAMES = ", ".join(r.value for r in (UserRole.armorer, UserRole.admin))
+_CHECKOUT_FORBIDDEN_DETAIL = f"Only {_CHECKOUT_ROLE_NAMES} can check out kits"
+_TRANSFER_FORBIDDEN_DETAIL = f"Only {_CHECKOUT_ROLE_NAMES} can transfer kit custody"
+_LOST_FORBIDDEN_DETAIL = f"Only {_ARMORER_ROLE_NAMES} can report kits as lost"
+_FOUND_FORBIDDEN_DETAIL = f"Only {_ARMORER_ROLE_NAMES} can report kits as found"
+
+
+def _status_details(template: str) -> dict:
+    """Format a 400 detail template once for every kit status."""
+    return {status: template.format(status=status) for status in KitStatus}
+
+
+# 400 details keyed by the kit's current status
+_CHECKOUT_STATUS_DETAILS = _status_details("Kit is currently {status} and cannot be checked out")
+_TRANSFER_STATUS_DETAILS = _status_details(
+    "Kit must be checked out to transfer custody. Current status: {status}"
+)
+_LOST_STATUS_DETAILS = _status_details("Kit is already marked as lost")
+_FOUND_STATUS_DETAILS = _status_details("Kit is currently {status} and is not lost")
+
+
+# Kit lookups shared by the custody operations, built once with a bound code
+_KIT_STATUS_STMT = select(Kit.status).where(Kit.code == bindparam("code"))
+# Locks the kit row (on PostgreSQL) so the custodian read is the one the transfer replaces
+_KIT_CUSTODIAN_NAME_STMT = (
+    select(Kit.current_custodian_name)
+    .where(Kit.code == bindparam("code"))
+    .with_for_update()
+)
+
+
+def _update_kit_or_raise(
+    db: Session,
+    kit_code: str,
+    status_condition,
+    status_details: dict,
+    **values
+) -> Kit:
+    """
+    Apply a status transition to a kit in a single conditional UPDATE.
+    
+    The status check lives in the WHERE clause, so two concurrent requests
+    cannot both pass validation for the same kit. The kit is only read again
+    when the UPDATE matches nothing, to tell a missing kit from a wrong status.
+    
+    Args:
+        db: Database session
+        kit_code: Kit code to update
+        status_condition: SQL expression the kit's current status must satisfy
+        status_details: 400 detail messages keyed by the kit's current status
+        **values: Column values to set on the kit
+        
+    Returns:
+        The updated kit
+        
+    Raises:
+        HTTPException: 404 if the kit does not exist, 400 if its status doesn't match
+    """
+    stmt = (
+        update(Kit)
+        .where(Kit.code == kit_code, status_condition)
+        .values(**values)
+        .returning(Kit)
+        .options(*NO_LAZY_LOADS)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    kit = db.scalars(stmt).first()
+    if kit is None:
+        _raise_kit_not_updated(db, kit_code, status_details)
+    
+    return kit
+
+
+def _raise_kit_not_updated(db: Session, kit_code: str, status_details: dict) -> None:
+    """
+    Raise the appropriate error for a kit that a conditional UPDATE didn't match.
+    
+    Args:
+        db: Database session
+        kit_code: Kit code that was being updated
+        status_details: 400 detail messages keyed by the kit's current status
+        
+    Raises:
+        HTTPException: 404 if the kit does not exist, otherwise 400
+    """
+    kit_status = db.scalar(_KIT_STATUS_STMT, {"code": kit_code})
+    if kit_status is None:
+        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
+    
+    raise HTTPException(status_code=400, detail=status_details[kit_status])
 
 
 def checkout_kit_onprem(
@@ -43,24 +149,19 @@ def checkout_kit_onprem(
         HTTPException: If kit not found, already checked out, or user lacks permission
     """
     # Verify permissions - only Coach, Armorer, or Admin can checkout kits
-    allowed_roles = [UserRole.coach, UserRole.armorer, UserRole.admin]
-    if initiated_by_user.role not in allowed_roles:
-        raise HTTPException(
-            status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can check out kits"
-        )
-    
-    # Find kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
-    
-    # Check kit status - must be available
-    if kit.status != KitStatus.available:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit is currently {kit.status} and cannot be checked out"
-        )
+    if initiated_by_user.role not in _CHECKOUT_ROLES:
+        raise HTTPException(status_code=403, detail=_CHECKOUT_FORBIDDEN_DETAIL)
+    
+    # Update kit status - kit must be available
+    kit = _update_kit_or_raise(
+        db,
+        kit_code,
+        Kit.status == KitStatus.available,
+        _CHECKOUT_STATUS_DETAILS,
+        status=KitStatus.checked_out,
+        current_custodian_id=custodian_id,
+        current_custodian_name=custodian_name
+    )
     
     # Create custody event
     custody_event = CustodyEvent(
@@ -75,20 +176,122 @@ def checkout_kit_onprem(
         expected_return_date=expected_return_date
     )
     
-    # Update kit status
-    kit.status = KitStatus.checked_out
-    kit.current_custodian_id = custodian_id
-    kit.current_custodian_name = custodian_name
-    
     # Save to database
     db.add(custody_event)
     db.commit()
-    db.refresh(custody_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit_code)
     
     return custody_event, kit
 
 
+def checkout_kits_onprem(
+    db: Session,
+    checkouts: List[CustodyCheckoutRequest],
+    initiated_by_user: User
+) -> List[tuple[CustodyEvent, Kit]]:
+    """
+    Check out several kits on-premises in a single transaction.
+    
+    Batch form of checkout_kit_onprem for buffered QR scans: all kits are
+    updated with one conditional UPDATE and all custody events are written
+    with one multi-row INSERT. The batch is all-or-nothing - if any kit is
+    missing or not available, no kit is checked out.
+    
+    Args:
+        db: Database session
+        checkouts: Checkout details for each kit (kit code, custodian, notes, etc.)
+        initiated_by_user: User performing the checkout (must be Coach or Armorer)
+        
+    Returns:
+        List of (custody_event, kit) tuples, in the same order as checkouts
+        
+    Raises:
+        HTTPException: If a kit is not found, not available, listed twice, or user lacks permission
+    """
+    # Verify permissions - only Coach, Armorer, or Admin can checkout kits
+    if initiated_by_user.role not in _CHECKOUT_ROLES:
+        raise HTTPException(status_code=403, detail=_CHECKOUT_FORBIDDEN_DETAIL)
+    
+    kit_codes = [checkout.kit_code for checkout in checkouts]
+    if len(set(kit_codes)) != len(kit_codes):
+        raise HTTPException(status_code=400, detail="Each kit can only be checked out once per request")
+    
+    # Update all kits at once - each kit must be available
+    custodian_ids = {checkout.kit_code: checkout.custodian_id for checkout in checkouts}
+    custodian_names = {checkout.kit_code: checkout.custodian_name for checkout in checkouts}
+    stmt = (
+        update(Kit)
+        .where(Kit.code.in_(kit_codes), Kit.status == KitStatus.available)
+        .values(
+            status=KitStatus.checked_out,
+            current_custodian_id=cast(case(custodian_ids, value=Kit.code), Integer),
+            current_custodian_name=case(custodian_names, value=Kit.code)
+        )
+        .returning(Kit)
+        .options(*NO_LAZY_LOADS)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    kits_by_code = {kit.code: kit for kit in db.scalars(stmt)}
+    
+    # Undo the partial update and report the first kit that couldn't be checked out
+    if len(kits_by_code) != len(kit_codes):
+        db.rollback()
+        failed_code = next(code for code in kit_codes if code not in kits_by_code)
+        _raise_kit_not_updated(db, failed_code, _CHECKOUT_STATUS_DETAILS)
+    
+    # Create custody events
+    event_stmt = insert(CustodyEvent).returning(CustodyEvent, sort_by_parameter_order=True)
+    custody_events = db.scalars(event_stmt, [
+        {
+            "event_type": CustodyEventType.checkout_onprem,
+            "kit_id": kits_by_code[checkout.kit_code].id,
+            "initiated_by_id": initiated_by_user.id,
+            "initiated_by_name": initiated_by_user.name,
+            "custodian_id": checkout.custodian_id,
+            "custodian_name": checkout.custodian_name,
+            "notes": checkout.notes,
+            "location_type": "on_premises",
+            "expected_return_date": checkout.expected_return_date
+        }
+        for checkout in checkouts
+    ]).all()
+    
+    # Save to database
+    db.commit()
+    KitService.invalidate_lookup(*kit_codes)
+    
+    return [
+        (custody_event, kits_by_code[kit_code])
+        for custody_event, kit_code in zip(custody_events, kit_codes)
+    ]
+
+
+def bulk_record_events(db: Session, events: List[dict]) -> int:
+    """
+    Append many custody events at once, for backfill and replay jobs.
+    
+    Events are inserted as multi-row INSERT ... VALUES statements of up to
+    EVENT_BATCH_SIZE rows each, rather than one INSERT per event. No ORM
+    objects are created and kit state is not touched - the events are
+    recorded exactly as given.
+    
+    Args:
+        db: Database session
+        events: Column values for each event (event_type, kit_id, initiated_by_id, ...)
+        
+    Returns:
+        Number of events recorded
+    """
+    stmt = insert(CustodyEvent)
+    for start in range(0, len(events), EVENT_BATCH_SIZE):
+        db.execute(stmt.values(events[start:start + EVENT_BATCH_SIZE]))
+    
+    # Save to database
+    db.commit()
+    
+    return len(events)
+
+
 def transfer_kit_custody(
     db: Session,
     kit_code: str,
@@ -118,28 +321,22 @@ def transfer_kit_custody(
         HTTPException: If kit not found, not checked out, or user lacks permission
     """
     # Verify permissions - only Coach, Armorer, or Admin can transfer kits
-    allowed_roles = [UserRole.coach, UserRole.armorer, UserRole.admin]
-    if initiated_by_user.role not in allowed_roles:
-        # UserRole inherits from str, so .value returns the string representation
-        raise HTTPException(
-            status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can transfer kit custody"
-        )
-    
-    # Find kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
-    
-    # Check kit status - must be checked out to be transferred
-    if kit.status != KitStatus.checked_out:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit must be checked out to transfer custody. Current status: {kit.status}"
-        )
-    
-    # Store previous custodian for response
-    previous_custodian = kit.current_custodian_name or "Unknown"
+    if initiated_by_user.role not in _CHECKOUT_ROLES:
+        raise HTTPException(status_code=403, detail=_TRANSFER_FORBIDDEN_DETAIL)
+    
+    # Store previous custodian for response - the row stays locked until commit,
+    # so no concurrent transfer can change it before the UPDATE below
+    previous_custodian = db.scalar(_KIT_CUSTODIAN_NAME_STMT, {"code": kit_code}) or "Unknown"
+    
+    # Update kit custodian - kit must be checked out to be transferred
+    kit = _update_kit_or_raise(
+        db,
+        kit_code,
+        Kit.status == KitStatus.checked_out,
+        _TRANSFER_STATUS_DETAILS,
+        current_custodian_id=new_custodian_id,
+        current_custodian_name=new_custodian_name
+    )
     
     # Create custody event
     custody_event = CustodyEvent(
@@ -153,15 +350,10 @@ def transfer_kit_custody(
         location_type="on_premises"  # Transfer is assumed to be on-premises
     )
     
-    # Update kit custodian
-    kit.current_custodian_id = new_custodian_id
-    kit.current_custodian_name = new_custodian_name
-    
     # Save to database
     db.add(custody_event)
     db.commit()
-    db.refresh(custody_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit_code)
     
     return custody_event, kit, previous_custodian
 
@@ -191,25 +383,18 @@ def report_kit_lost(
         HTTPException: If kit not found, already lost, or user lacks permission
     """
     # Verify permissions - only Armorer or Admin can report kits as lost
-    allowed_roles = [UserRole.armorer, UserRole.admin]
-    if initiated_by_user.role not in allowed_roles:
-        # UserRole inherits from str, so .value returns the string representation
-        raise HTTPException(
-            status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can report kits as lost"
-        )
-    
-    # Find kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
+    if initiated_by_user.role not in _ARMORER_ROLES:
+        raise HTTPException(status_code=403, detail=_LOST_FORBIDDEN_DETAIL)
     
-    # Check kit status - cannot report as lost if already lost
-    if kit.status == KitStatus.lost:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit is already marked as lost"
-        )
+    # Update kit status - cannot report as lost if already lost
+    # Keep custodian info to track who had it last
+    kit = _update_kit_or_raise(
+        db,
+        kit_code,
+        Kit.status != KitStatus.lost,
+        _LOST_STATUS_DETAILS,
+        status=KitStatus.lost
+    )
     
     # Create custody event
     custody_event = CustodyEvent(
@@ -223,15 +408,10 @@ def report_kit_lost(
         location_type="unknown"
     )
     
-    # Update kit status
-    kit.status = KitStatus.lost
-    # Keep custodian info to track who had it last
-    
     # Save to database
     db.add(custody_event)
     db.commit()
-    db.refresh(custody_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit_code)
     
     return custody_event, kit
 
@@ -261,24 +441,19 @@ def report_kit_found(
         HTTPException: If kit not found, not currently lost, or user lacks permission
     """
     # Verify permissions - only Armorer or Admin can report kits as found
-    allowed_roles = [UserRole.armorer, UserRole.admin]
-    if initiated_by_user.role not in allowed_roles:
-        raise HTTPException(
-            status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can report kits as found"
-        )
-    
-    # Find kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
-    
-    # Check kit status - must be lost to mark as found
-    if kit.status != KitStatus.lost:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit is currently {kit.status} and is not lost"
-        )
+    if initiated_by_user.role not in _ARMORER_ROLES:
+        raise HTTPException(status_code=403, detail=_FOUND_FORBIDDEN_DETAIL)
+    
+    # Update kit status to available and clear custodian info - kit must be lost
+    kit = _update_kit_or_raise(
+        db,
+        kit_code,
+        Kit.status == KitStatus.lost,
+        _FOUND_STATUS_DETAILS,
+        status=KitStatus.available,
+        current_custodian_id=None,
+        current_custodian_name=None
+    )
     
     # Create custody event
     custody_event = CustodyEvent(
@@ -292,15 +467,9 @@ def report_kit_found(
         location_type="on_premises"
     )
     
-    # Update kit status to available and clear custodian info
-    kit.status = KitStatus.available
-    kit.current_custodian_id = None
-    kit.current_custodian_name = None
-    
     # Save to database
     db.add(custody_event)
     db.commit()
-    db.refresh(custody_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit_code)
     
     return custody_event, kit
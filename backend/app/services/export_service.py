@@ -5,131 +5,191 @@ Implements AUDIT-001: Export complete audit logs as CSV/JSON for incident respon
 and compliance requests.
 """
 
-import csv
-import json
-from io import StringIO
+import orjson
+import re
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, Iterator, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine, Result
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models.custody_event import CustodyEvent
 
 
-def export_custody_events_to_csv(
+# Number of events fetched from the database (and written out) per batch
+EXPORT_BATCH_SIZE = 1000
+
+# Columns included in exports, in output order
+_EXPORT_COLUMNS = (
+    CustodyEvent.id,
+    CustodyEvent.event_type,
+    CustodyEvent.kit_id,
+    CustodyEvent.initiated_by_id,
+    CustodyEvent.initiated_by_name,
+    CustodyEvent.custodian_id,
+    CustodyEvent.custodian_name,
+    CustodyEvent.notes,
+    CustodyEvent.location_type,
+    CustodyEvent.created_at,
+    CustodyEvent.updated_at,
+)
+
+
+def _execute_export_query(
     db: Session,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
-) -> str:
+) -> Result:
     """
-    Export custody events to CSV format.
-    
+    Run the custody event query shared by the CSV and JSON exports.
+
+    Only the exported columns are selected, so rows come back as plain tuples
+    rather than full CustodyEvent instances.
+
     Args:
         db: Database session
         start_date: Optional start date for filtering
         end_date: Optional end date for filtering
-        
+
     Returns:
-        CSV string with all custody events
+        Result over the matching events, oldest first, fetched in batches
     """
     # Build query
-    query = db.query(CustodyEvent)
-    
+    stmt = select(*_EXPORT_COLUMNS)
+
     # Apply date filtering if provided
     if start_date:
-        query = query.filter(CustodyEvent.created_at >= start_date)
+        stmt = stmt.where(CustodyEvent.created_at >= start_date)
     if end_date:
-        query = query.filter(CustodyEvent.created_at <= end_date)
-    
+        stmt = stmt.where(CustodyEvent.created_at <= end_date)
+
     # Order by creation date
-    query = query.order_by(CustodyEvent.created_at.asc())
-    
-    # Fetch events
-    events = query.all()
-    
-    # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    
+    stmt = stmt.order_by(CustodyEvent.created_at.asc())
+
+    # Stream rows from a server-side cursor instead of loading them all at once
+    return db.execute(
+        stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+# CSV output matches csv.writer's defaults (QUOTE_MINIMAL, \r\n line endings)
+_CSV_HEADER = (",".join(column.key for column in _EXPORT_COLUMNS) + "\r\n").encode("utf-8")
+_CSV_ROW_FORMAT = "{},{},{},{},{},{},{},{},{},{},{}\r\n".format
+_CSV_NEEDS_QUOTING = re.compile(r'[,"\r\n]')
+
+
+def _csv_field(value: Optional[str]) -> str:
+    """Render a free-text field, quoting it only when it contains CSV special characters."""
+    if value is None:
+        return ''
+    if _CSV_NEEDS_QUOTING.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def export_custody_events_to_csv(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Iterator[bytes]:
+    """
+    Export custody events to CSV format.
+
+    Events are read and written in batches of EXPORT_BATCH_SIZE, so memory use
+    stays flat regardless of how large the audit log is. Rows are formatted
+    directly; only the free-text name, notes and location fields go through quoting.
+
+    Args:
+        db: Database session
+        start_date: Optional start date for filtering
+        end_date: Optional end date for filtering
+
+    Yields:
+        Chunks of UTF-8 encoded CSV, starting with the header row
+    """
+    result = _execute_export_query(db, start_date, end_date)
+
     # Write header
-    writer.writerow([
-        'id',
-        'event_type',
-        'kit_id',
-        'initiated_by_id',
-        'initiated_by_name',
-        'custodian_id',
-        'custodian_name',
-        'notes',
-        'location_type',
-        'created_at',
-        'updated_at'
-    ])
-    
-    # Write data rows
-    for event in events:
-        writer.writerow([
-            event.id,
-            event.event_type.value,
-            event.kit_id,
-            event.initiated_by_id,
-            event.initiated_by_name,
-            event.custodian_id or '',
-            event.custodian_name,
-            event.notes or '',
-            event.location_type,
-            event.created_at.isoformat(),
-            event.updated_at.isoformat()
-        ])
-    
-    return output.getvalue()
+    yield _CSV_HEADER
+
+    # Write data rows, one batch at a time
+    for batch in result.partitions():
+        yield "".join(
+            _CSV_ROW_FORMAT(
+                event_id, event_type.value, kit_id, initiated_by_id, _csv_field(initiated_by_name),
+                '' if custodian_id is None else custodian_id, _csv_field(custodian_name),
+                _csv_field(notes), _csv_field(location_type),
+                created_at.isoformat(), updated_at.isoformat()
+            )
+            for (
+                event_id, event_type, kit_id, initiated_by_id, initiated_by_name,
+                custodian_id, custodian_name, notes, location_type,
+                created_at, updated_at
+            ) in batch
+        ).encode("utf-8")
 
 
 def export_custody_events_to_json(
     db: Session,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
-) -> str:
+) -> Iterator[bytes]:
     """
     Export custody events to JSON format.
-    
+
+    The JSON array is written out incrementally, one batch of events at a time.
+    orjson serializes the enum and datetime columns natively, so rows are
+    encoded as they come back from the database.
+
     Args:
         db: Database session
         start_date: Optional start date for filtering
         end_date: Optional end date for filtering
-        
-    Returns:
-        JSON string with all custody events
+
+    Yields:
+        Chunks of a JSON array containing all custody events
     """
-    # Build query
-    query = db.query(CustodyEvent)
-    
-    # Apply date filtering if provided
-    if start_date:
-        query = query.filter(CustodyEvent.created_at >= start_date)
-    if end_date:
-        query = query.filter(CustodyEvent.created_at <= end_date)
-    
-    # Order by creation date
-    query = query.order_by(CustodyEvent.created_at.asc())
-    
-    # Fetch events
-    events = query.all()
+    result = _execute_export_query(db, start_date, end_date).mappings()
+
+    separator = b'\n'
+    yield b'['
+
+    for batch in result.partitions():
+        chunks = []
+        for event in batch:
+            chunks.append(separator)
+            chunks.append(orjson.dumps(dict(event)))
+            separator = b',\n'
+        yield b''.join(chunks)
+
+    yield b'\n]'
+
+
+def stream_export(
+    bind: Union[Engine, Connection],
+    export: Callable[[Session, Optional[datetime], Optional[datetime]], Iterator[bytes]],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Iterator[bytes]:
+    """
+    Run an export with its own database session, for use as a streaming response body.
     
-    # Convert to list of dicts
-    events_data = []
-    for event in events:
-        events_data.append({
-            'id': event.id,
-            'event_type': event.event_type.value,
-            'kit_id': event.kit_id,
-            'initiated_by_id': event.initiated_by_id,
-            'initiated_by_name': event.initiated_by_name,
-            'custodian_id': event.custodian_id,
-            'custodian_name': event.custodian_name,
-            'notes': event.notes,
-            'location_type': event.location_type,
-            'created_at': event.created_at.isoformat(),
-            'updated_at': event.updated_at.isoformat()
-        })
+    The export generators only query the database once the body is iterated,
+    which may be after the request's session has been closed. Opening the
+    session here ties its lifetime to the stream instead.
     
-    return json.dumps(events_data, indent=2)
+    Args:
+        bind: Engine or connection to open the session on (usually the request session's bind)
+        export: export_custody_events_to_csv or export_custody_events_to_json
+        start_date: Optional start date for filtering
+        end_date: Optional end date for filtering
+        
+    Yields:
+        Chunks of the export
+    """
+    db = SessionLocal(bind=bind)
+    try:
+        yield from export(db, start_date, end_date)
+    finally:
+        db.close()
@@ -1,13 +1,42 @@
+import threading
+from cachetools import TTLCache
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.models.kit import Kit
-from app.schemas.kit import KitLookupResponse
+from app.models.kit import Kit, KitStatus
+
+# Short-lived cache of lookups by kit code, to absorb repeated scans of the same
+# QR code. Writes that change a kit invalidate its entry in this process; the
+# TTL bounds staleness across worker processes.
+_LOOKUP_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=2.0)
+_LOOKUP_CACHE_LOCK = threading.Lock()
+
+
+@dataclass(slots=True, frozen=True)
+class KitLookupRow:
+    """
+    Lightweight, immutable result of a kit lookup.
+    
+    Fields match KitLookupResponse; API routes convert with
+    KitLookupResponse.model_validate(row) when building the response.
+    """
+    id: int
+    code: str
+    name: str
+    description: Optional[str]
+    status: KitStatus
+    custodian: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
 
 class KitService:
     """Service class for kit-related operations"""
     
     @staticmethod
-    def lookup_by_code(db: Session, code: str) -> Optional[KitLookupResponse]:
+    def lookup_by_code(db: Session, code: str) -> Optional[KitLookupRow]:
         """
         Lookup a kit by its code (from QR scan or manual entry)
         
@@ -16,21 +45,47 @@ class KitService:
             code: Kit code to lookup
             
         Returns:
-            KitLookupResponse if found, None otherwise
+            KitLookupRow if found, None otherwise
         """
-        kit = db.query(Kit).filter(Kit.code == code).first()
+        with _LOOKUP_CACHE_LOCK:
+            cached = _LOOKUP_CACHE.get(code)
+        if cached is not None:
+            return cached
+        
+        # Select only the lookup columns; all but the timestamps come from
+        # ix_kits_code_covering. lambda_stmt caches the built statement, so only the
+        # code is bound per call
+        stmt = lambda_stmt(lambda: select(
+            Kit.id,
+            Kit.code,
+            Kit.name,
+            Kit.description,
+            Kit.status,
+            Kit.current_custodian_name,
+            Kit.created_at,
+            Kit.updated_at
+        ).where(Kit.code == code))
+        kit = db.execute(stmt).first()
         
         if not kit:
             return None
         
-        # Transform to lookup response format
-        return KitLookupResponse(
-            id=kit.id,
-            code=kit.code,
-            name=kit.name,
-            description=kit.description,
-            status=kit.status,
-            custodian=kit.current_custodian_name,
-            created_at=kit.created_at,
-            updated_at=kit.updated_at
-        )
+        # Columns are selected in KitLookupRow field order
+        lookup = KitLookupRow(*kit)
+        
+        with _LOOKUP_CACHE_LOCK:
+            _LOOKUP_CACHE[code] = lookup
+        
+        return lookup
+    
+    @staticmethod
+    def invalidate_lookup(*codes: str) -> None:
+        """
+        Drop cached lookups for the given kit codes after the kits change
+        
+        Args:
+            codes: Kit codes whose cached lookups are stale
+        """
+        with _LOOKUP_CACHE_LOCK:
+            for code in codes:
+                _LOOKUP_CACHE.pop(code, None)
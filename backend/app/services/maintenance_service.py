@@ -2,14 +2,81 @@
 Maintenance service - handles maintenance event logic and validation
 """
 
+from sqlalchemy import lambda_stmt, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from typing import Optional
 from datetime import date, timedelta
 
+from app.database import NO_LAZY_LOADS
 from app.models.maintenance_event import MaintenanceEvent
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
+from app.services.kit_service import KitService
+
+# Roles allowed to open and close maintenance
+_MAINTENANCE_ROLES = frozenset({UserRole.armorer, UserRole.admin})
+_MAINTENANCE_ROLES_TEXT = ", ".join(role.value for role in (UserRole.armorer, UserRole.admin))
+
+
+def _update_kit_in_maintenance(
+    db: Session,
+    kit_code: str,
+    status_condition,
+    status_detail: str,
+    event_condition=None,
+    event_detail: Optional[str] = None,
+    **values
+) -> Kit:
+    """
+    Update a kit by code with one conditional UPDATE ... RETURNING.
+    
+    The status condition is checked in the same statement as the update, so
+    two concurrent requests cannot both move the kit into (or out of)
+    maintenance. Nothing is written when a condition fails.
+    
+    Args:
+        db: Database session
+        kit_code: Kit code to update
+        status_condition: SQL condition the kit's current status must satisfy
+        status_detail: Error detail if the condition fails, formatted with the kit name
+        event_condition: Optional further SQL condition on the kit's maintenance events
+        event_detail: Error detail if event_condition fails, formatted with the kit name
+        values: Kit columns to set
+        
+    Returns:
+        The updated kit
+        
+    Raises:
+        HTTPException: If kit not found or a condition is not satisfied
+    """
+    conditions = [Kit.code == kit_code, status_condition]
+    if event_condition is not None:
+        conditions.append(event_condition)
+    stmt = (
+        update(Kit)
+        .where(*conditions)
+        .values(**values)
+        .returning(Kit)
+        .options(*NO_LAZY_LOADS)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    kit = db.scalars(stmt).first()
+    if kit:
+        return kit
+    
+    # Nothing was updated - tell apart a missing kit from one in the wrong status
+    if event_condition is None:
+        kit_name = db.scalars(lambda_stmt(lambda: select(Kit.name).where(Kit.code == kit_code))).first()
+        status_ok = False
+    else:
+        row = db.execute(select(Kit.name, status_condition).where(Kit.code == kit_code)).first()
+        kit_name, status_ok = row if row else (None, False)
+    if kit_name is None:
+        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
+    if status_ok:
+        raise HTTPException(status_code=400, detail=event_detail.format(name=kit_name))
+    raise HTTPException(status_code=400, detail=status_detail.format(name=kit_name))
 
 
 def open_maintenance(
@@ -41,24 +108,20 @@ def open_maintenance(
         HTTPException: If kit not found, already in maintenance, or user lacks permission
     """
     # Verify permissions - only Armorer or Admin can open maintenance
-    allowed_roles = [UserRole.armorer, UserRole.admin]
-    if opened_by_user.role not in allowed_roles:
+    if opened_by_user.role not in _MAINTENANCE_ROLES:
         raise HTTPException(
             status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can open maintenance"
+            detail=f"Only {_MAINTENANCE_ROLES_TEXT} can open maintenance"
         )
     
-    # Get kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
-    
-    # Check if kit is already in maintenance
-    if kit.status == KitStatus.in_maintenance:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit '{kit.name}' is already in maintenance"
-        )
+    # Update kit status to in_maintenance - kit must not already be in maintenance
+    kit = _update_kit_in_maintenance(
+        db,
+        kit_code,
+        Kit.status != KitStatus.in_maintenance,
+        "Kit '{name}' is already in maintenance",
+        status=KitStatus.in_maintenance
+    )
     
     # Create maintenance event
     maintenance_event = MaintenanceEvent(
@@ -71,13 +134,9 @@ def open_maintenance(
         is_open=1
     )
     
-    # Update kit status to in_maintenance
-    kit.status = KitStatus.in_maintenance
-    
     db.add(maintenance_event)
     db.commit()
-    db.refresh(maintenance_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit.code)
     
     return maintenance_event, kit
 
@@ -114,36 +173,42 @@ def close_maintenance(
         HTTPException: If kit not found, not in maintenance, or user lacks permission
     """
     # Verify permissions - only Armorer or Admin can close maintenance
-    allowed_roles = [UserRole.armorer, UserRole.admin]
-    if closed_by_user.role not in allowed_roles:
+    if closed_by_user.role not in _MAINTENANCE_ROLES:
         raise HTTPException(
             status_code=403,
-            detail=f"Only {', '.join([r.value for r in allowed_roles])} can close maintenance"
+            detail=f"Only {_MAINTENANCE_ROLES_TEXT} can close maintenance"
         )
     
-    # Get kit by code
-    kit = db.query(Kit).filter(Kit.code == kit_code).first()
-    if not kit:
-        raise HTTPException(status_code=404, detail=f"Kit with code '{kit_code}' not found")
-    
-    # Check if kit is in maintenance
-    if kit.status != KitStatus.in_maintenance:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Kit '{kit.name}' is not in maintenance"
-        )
+    # Update kit status to available - kit must be in maintenance
+    kit_values = {
+        "status": KitStatus.available,
+        "current_custodian_id": None,
+        "current_custodian_name": None
+    }
+    next_date = None
+    if next_maintenance_days is not None:
+        next_date = date.today() + timedelta(days=next_maintenance_days)
+        kit_values["next_maintenance_date"] = next_date
+    # The open-event check is part of the UPDATE, so a kit without one is never written
+    open_event_exists = select(MaintenanceEvent.id).where(
+        MaintenanceEvent.kit_id == Kit.id,
+        MaintenanceEvent.is_open == 1
+    ).exists()
+    kit = _update_kit_in_maintenance(
+        db,
+        kit_code,
+        Kit.status == KitStatus.in_maintenance,
+        "Kit '{name}' is not in maintenance",
+        open_event_exists,
+        "No open maintenance event found for kit '{name}'",
+        **kit_values
+    )
     
     # Find the open maintenance event
-    open_event = db.query(MaintenanceEvent).filter(
+    open_event = db.query(MaintenanceEvent).options(*NO_LAZY_LOADS).filter(
         MaintenanceEvent.kit_id == kit.id,
         MaintenanceEvent.is_open == 1
-    ).first()
-    
-    if not open_event:
-        raise HTTPException(
-            status_code=400,
-            detail=f"No open maintenance event found for kit '{kit.name}'"
-        )
+    ).one()
     
     # Update maintenance event with close information
     open_event.closed_by_id = closed_by_user.id
@@ -169,18 +234,10 @@ def close_maintenance(
         open_event.round_count = round_count
     
     # Set next maintenance date if provided
-    if next_maintenance_days is not None:
-        next_date = date.today() + timedelta(days=next_maintenance_days)
+    if next_date is not None:
         open_event.next_maintenance_date = next_date
-        kit.next_maintenance_date = next_date
-    
-    # Update kit status to available
-    kit.status = KitStatus.available
-    kit.current_custodian_id = None
-    kit.current_custodian_name = None
     
     db.commit()
-    db.refresh(open_event)
-    db.refresh(kit)
+    KitService.invalidate_lookup(kit.code)
     
     return open_event, kit
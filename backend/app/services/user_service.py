@@ -1,7 +1,15 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.schemas.user import UserCreate
 
+# Dialects whose INSERT supports ON CONFLICT ... DO NOTHING ... RETURNING
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
@@ -27,14 +35,59 @@ def create_user(db: Session, user: UserCreate):
     return db_user
 
 def get_or_create_user(db: Session, provider: str, oauth_id: str, email: str, name: str):
+    """
+    Get the user for an OAuth identity, creating it on first login.
+    
+    Existing users are found with a plain SELECT, so a returning user's login
+    writes nothing. On a miss the user is inserted with INSERT ... ON CONFLICT
+    (oauth_provider, oauth_id) DO NOTHING, so concurrent first logins for the
+    same identity can't create two users; the loser re-reads the winner's row.
+    """
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        return _get_or_create_user_fallback(db, provider, oauth_id, email, name)
+    
     user = get_user_by_oauth(db, provider, oauth_id)
-    if not user:
-        user_create = UserCreate(
-            email=email,
-            name=name,
-            oauth_provider=provider,
-            oauth_id=oauth_id,
-            role="parent"  # Default role for new users
-        )
-        user = create_user(db, user_create)
+    if user:
+        return user
+    
+    stmt = dialect_insert(User).values(
+        email=email,
+        name=name,
+        oauth_provider=provider,
+        oauth_id=oauth_id,
+        role=UserRole.parent,  # Default role for new users
+        verified_adult=False,
+        is_active=True
+    ).on_conflict_do_nothing(
+        index_elements=[User.oauth_provider, User.oauth_id]
+    ).returning(User)
+    
+    user = db.scalars(stmt).first()
+    db.commit()
+    if user is None:
+        # A concurrent login inserted the user first
+        user = get_user_by_oauth(db, provider, oauth_id)
     return user
+
+def _get_or_create_user_fallback(db: Session, provider: str, oauth_id: str, email: str, name: str):
+    """Check-then-insert for dialects without ON CONFLICT, re-reading the user if a concurrent insert wins."""
+    user = get_user_by_oauth(db, provider, oauth_id)
+    if user:
+        return user
+    
+    user_create = UserCreate(
+        email=email,
+        name=name,
+        oauth_provider=provider,
+        oauth_id=oauth_id,
+        role="parent"  # Default role for new users
+    )
+    try:
+        return create_user(db, user_create)
+    except IntegrityError:
+        db.rollback()
+        user = get_user_by_oauth(db, provider, oauth_id)
+        if not user:
+            raise
+        return user
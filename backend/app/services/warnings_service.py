@@ -7,97 +7,149 @@ Implements CUSTODY-008, CUSTODY-014, and MAINT-002:
 - As an Armorer, I want to see soft warnings for overdue maintenance
 """
 
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, List, Any
-from datetime import date, datetime, timedelta
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Any, Iterable
+from datetime import date, datetime, time, timedelta
 
+from app.database import NO_LAZY_LOADS
 from app.models.kit import Kit, KitStatus
 from app.models.custody_event import CustodyEvent, CustodyEventType
 from app.constants import EXTENDED_CUSTODY_WARNING_DAYS, OVERDUE_RETURN_WARNING_DAYS, OVERDUE_MAINTENANCE_WARNING_DAYS
 
 
-def calculate_kit_warnings(kit: Kit, db: Session) -> Dict[str, Any]:
+# Event types that start a custody period
+CHECKOUT_EVENT_TYPES = (CustodyEventType.checkout_onprem, CustodyEventType.checkout_offsite)
+
+
+@dataclass(slots=True)
+class KitWarnings:
+    """Custody and maintenance warnings for a single kit."""
+    has_warning: bool = False
+    overdue_return: bool = False
+    extended_custody: bool = False
+    days_overdue: Optional[int] = None
+    days_checked_out: Optional[int] = None
+    expected_return_date: Optional[date] = None
+    checkout_date: Optional[datetime] = None
+    overdue_maintenance: bool = False
+    days_maintenance_overdue: Optional[int] = None
+    next_maintenance_date: Optional[date] = None
+
+
+def _latest_checkout_subquery(db: Session, *criteria):
+    """Subquery of (kit_id, latest_created_at) for the latest checkout of each kit matching criteria."""
+    return db.query(
+        CustodyEvent.kit_id,
+        func.max(CustodyEvent.created_at).label("latest_created_at")
+    ).filter(
+        CustodyEvent.event_type.in_(CHECKOUT_EVENT_TYPES),
+        *criteria
+    ).group_by(CustodyEvent.kit_id).subquery()
+
+
+def _latest_checkout_join(latest):
+    """Join condition from CustodyEvent to the checkout events selected by _latest_checkout_subquery."""
+    return and_(
+        CustodyEvent.kit_id == latest.c.kit_id,
+        CustodyEvent.created_at == latest.c.latest_created_at,
+        CustodyEvent.event_type.in_(CHECKOUT_EVENT_TYPES)
+    )
+
+
+def get_latest_checkouts(db: Session, kit_ids: Iterable[int]) -> Dict[int, CustodyEvent]:
+    """
+    Get the most recent checkout event for each of the given kits in one query.
+    
+    Returns dictionary mapping kit_id to its latest checkout event. Kits with
+    no checkout events are left out.
+    """
+    kit_ids = list(kit_ids)
+    if not kit_ids:
+        return {}
+    
+    latest = _latest_checkout_subquery(db, CustodyEvent.kit_id.in_(kit_ids))
+    latest_checkouts = db.query(CustodyEvent).options(*NO_LAZY_LOADS).join(
+        latest, _latest_checkout_join(latest)
+    ).all()
+    
+    return {event.kit_id: event for event in latest_checkouts}
+
+
+def calculate_kit_warnings(kit: Kit, db: Session) -> KitWarnings:
     """
     Calculate warnings for a kit - both custody and maintenance warnings.
     
-    Returns dictionary with warning information:
-    {
-        "has_warning": bool,
-        "overdue_return": bool,
-        "extended_custody": bool,
-        "days_overdue": int or None,
-        "days_checked_out": int or None,
-        "expected_return_date": date or None,
-        "checkout_date": datetime or None,
-        "overdue_maintenance": bool,
-        "days_maintenance_overdue": int or None,
-        "next_maintenance_date": date or None
-    }
+    Looks up the kit's latest checkout if it is checked out; see
+    build_kit_warnings for the returned warnings.
     """
-    warnings = {
-        "has_warning": False,
-        "overdue_return": False,
-        "extended_custody": False,
-        "days_overdue": None,
-        "days_checked_out": None,
-        "expected_return_date": None,
-        "checkout_date": None,
-        "overdue_maintenance": False,
-        "days_maintenance_overdue": None,
-        "next_maintenance_date": None
-    }
+    latest_checkout = None
+    if kit.status == KitStatus.checked_out:
+        latest_checkout = get_latest_checkouts(db, [kit.id]).get(kit.id)
+    
+    return build_kit_warnings(kit, latest_checkout)
+
+
+def build_kit_warnings(
+    kit: Kit,
+    latest_checkout: Optional[CustodyEvent],
+    today: Optional[date] = None
+) -> KitWarnings:
+    """
+    Build warnings for a kit from its already-loaded latest checkout event.
+    
+    Performs no database queries, so callers can batch-load checkouts with
+    get_latest_checkouts for many kits at once.
+    
+    Returns a KitWarnings with every flag False and every value None unless
+    the corresponding warning applies.
+    """
+    warnings = KitWarnings()
     
     # Get today's date once for efficiency
-    today = date.today()
+    if today is None:
+        today = date.today()
     
     # Check for custody warnings only for checked-out kits
     if kit.status == KitStatus.checked_out:
-        # Get the most recent checkout event for this kit
-        latest_checkout = db.query(CustodyEvent).filter(
-            CustodyEvent.kit_id == kit.id,
-            CustodyEvent.event_type.in_([
-                CustodyEventType.checkout_onprem,
-                CustodyEventType.checkout_offsite
-            ])
-        ).order_by(CustodyEvent.created_at.desc()).first()
-        
         if latest_checkout:
             # Store checkout date
-            warnings["checkout_date"] = latest_checkout.created_at
+            warnings.checkout_date = latest_checkout.created_at
             
             # Calculate days checked out
             checkout_date = latest_checkout.created_at.date()
             days_checked_out = (today - checkout_date).days
-            warnings["days_checked_out"] = days_checked_out
+            warnings.days_checked_out = days_checked_out
             
             # Check for overdue return
             if latest_checkout.expected_return_date:
-                warnings["expected_return_date"] = latest_checkout.expected_return_date
+                warnings.expected_return_date = latest_checkout.expected_return_date
                 
                 if today > latest_checkout.expected_return_date:
                     # Kit is overdue
                     days_overdue = (today - latest_checkout.expected_return_date).days
                     if days_overdue >= OVERDUE_RETURN_WARNING_DAYS:
-                        warnings["overdue_return"] = True
-                        warnings["days_overdue"] = days_overdue
-                        warnings["has_warning"] = True
+                        warnings.overdue_return = True
+                        warnings.days_overdue = days_overdue
+                        warnings.has_warning = True
             
             # Check for extended custody (no expected return date or has been out too long)
             if days_checked_out >= EXTENDED_CUSTODY_WARNING_DAYS:
-                warnings["extended_custody"] = True
-                warnings["has_warning"] = True
+                warnings.extended_custody = True
+                warnings.has_warning = True
     
     # Check for maintenance warnings for all kits (except those in maintenance)
     if kit.next_maintenance_date and kit.status != KitStatus.in_maintenance:
-        warnings["next_maintenance_date"] = kit.next_maintenance_date
+        warnings.next_maintenance_date = kit.next_maintenance_date
         
         if today > kit.next_maintenance_date:
             # Maintenance is overdue
             days_maintenance_overdue = (today - kit.next_maintenance_date).days
             if days_maintenance_overdue >= OVERDUE_MAINTENANCE_WARNING_DAYS:
-                warnings["overdue_maintenance"] = True
-                warnings["days_maintenance_overdue"] = days_maintenance_overdue
-                warnings["has_warning"] = True
+                warnings.overdue_maintenance = True
+                warnings.days_maintenance_overdue = days_maintenance_overdue
+                warnings.has_warning = True
     
     return warnings
 
@@ -106,6 +158,9 @@ def get_all_kits_with_warnings(db: Session) -> List[Dict[str, Any]]:
     """
     Get all kits that have warnings.
     
+    Covers custody warnings on checked-out kits and overdue maintenance on
+    any kit that is not currently in maintenance.
+    
     Returns list of dictionaries with kit info and warnings:
     [
         {
@@ -113,21 +168,66 @@ def get_all_kits_with_warnings(db: Session) -> List[Dict[str, Any]]:
             "kit_code": str,
             "kit_name": str,
             "custodian_name": str,
-            "warnings": {...}  # Output from calculate_kit_warnings
+            "warnings": KitWarnings  # Output from build_kit_warnings
         }
     ]
     """
     kits_with_warnings = []
+    today = date.today()
     
-    # Get all checked-out kits
-    checked_out_kits = db.query(Kit).filter(
-        Kit.status == KitStatus.checked_out
+    # Warning thresholds as cutoff dates, so the database can compare them against
+    # indexed columns directly. These mirror the day counts in build_kit_warnings.
+    extended_custody_before = datetime.combine(
+        today - timedelta(days=EXTENDED_CUSTODY_WARNING_DAYS - 1), time.min
+    )
+    overdue_return_by = today - timedelta(days=OVERDUE_RETURN_WARNING_DAYS)
+    overdue_maintenance_by = today - timedelta(days=OVERDUE_MAINTENANCE_WARNING_DAYS)
+    
+    # Latest checkout of each checked-out kit
+    latest = _latest_checkout_subquery(
+        db,
+        CustodyEvent.kit_id.in_(
+            db.query(Kit.id).filter(Kit.status == KitStatus.checked_out)
+        )
+    )
+    
+    # Fetch only kits that have a warning, each with its latest checkout, in one query
+    rows = db.query(Kit, CustodyEvent).options(*NO_LAZY_LOADS).outerjoin(
+        latest, latest.c.kit_id == Kit.id
+    ).outerjoin(
+        CustodyEvent, _latest_checkout_join(latest)
+    ).filter(
+        Kit.status != KitStatus.in_maintenance,
+        or_(
+            # Extended custody or overdue return
+            and_(
+                Kit.status == KitStatus.checked_out,
+                or_(
+                    CustodyEvent.created_at < extended_custody_before,
+                    and_(
+                        CustodyEvent.expected_return_date < today,
+                        CustodyEvent.expected_return_date <= overdue_return_by
+                    )
+                )
+            ),
+            # Overdue maintenance
+            and_(
+                Kit.next_maintenance_date < today,
+                Kit.next_maintenance_date <= overdue_maintenance_by
+            )
+        )
     ).all()
     
-    for kit in checked_out_kits:
-        warnings = calculate_kit_warnings(kit, db)
+    seen_kit_ids = set()
+    for kit, latest_checkout in rows:
+        # Checkouts sharing the latest timestamp would repeat the kit
+        if kit.id in seen_kit_ids:
+            continue
+        seen_kit_ids.add(kit.id)
+        
+        warnings = build_kit_warnings(kit, latest_checkout, today)
         
-        if warnings["has_warning"]:
+        if warnings.has_warning:
             kits_with_warnings.append({
                 "kit_id": kit.id,
                 "kit_code": kit.code,
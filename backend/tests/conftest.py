@@ -1,51 +1,99 @@
 import pytest
-import os
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 from app.main import app
 from app.database import Base, get_db
 from app.models.kit import Kit  # Import models to ensure they're registered
 
-# Use a test database file that we clean up
-TEST_DATABASE_URL = "sqlite:///./test_custody_manager.db"
+# Shared in-memory database; StaticPool keeps the single connection (and so the
+# database) alive for the whole test session. Each pytest-xdist worker is its own
+# process, so workers never share a database
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a fresh database session for each test"""
-    # Remove the test database if it exists
-    if os.path.exists("test_custody_manager.db"):
-        os.remove("test_custody_manager.db")
-    
-    # Create a new engine for this test
-    engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    
-    # Create all tables
+# pysqlite's own transaction handling breaks SAVEPOINTs; let SQLAlchemy emit BEGIN itself
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_tables():
+    """Create all tables once for the test session"""
     Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="module")
+def connection():
+    """
+    Connection holding one outer transaction for the whole module.
     
-    session = TestingSessionLocal()
+    Module-scoped sample data is committed inside it and rolled back once
+    all tests in the module have run.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="module")
+def module_session(connection):
+    """Session for inserting sample data shared by every test in a module"""
+    session = Session(
+        bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False
+    )
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="function")
+def db_session(connection):
+    """
+    Create a database session for each test, rolled back afterwards.
+    
+    Each test runs inside its own SAVEPOINT on the module connection;
+    commits and rollbacks made by the code under test only act on nested
+    SAVEPOINTs within it.
+    """
+    savepoint = connection.begin_nested()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        engine.dispose()
-        # Clean up the test database file
-        if os.path.exists("test_custody_manager.db"):
-            os.remove("test_custody_manager.db")
+        savepoint.rollback()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    """Create a test client, entering the app lifespan once for the session"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
-    """Create a test client with database override"""
+def client(app_client, db_session):
+    """Test client whose requests use this test's database session"""
     def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+        yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
-    app.dependency_overrides.clear()
+    try:
+        yield app_client
+    finally:
+        app.dependency_overrides.clear()
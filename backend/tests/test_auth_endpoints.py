@@ -1,41 +1,28 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.main import app
-from app.database import Base, get_db
-from app.core.security import create_access_token, create_refresh_token
+from app.core.security import create_access_token, create_refresh_token, SignatureExpired, BadSignature
 from app.models.user import User
-from app.api.v1.endpoints.auth import state_serializer
+from app.api.v1.endpoints.auth import state_serializer, load_state
 from datetime import datetime, timezone
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from unittest.mock import patch, MagicMock
+import requests
 
-# Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Override the get_db dependency
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-@pytest.fixture
-def client():
-    Base.metadata.create_all(bind=engine)
-    yield TestClient(app)
-    Base.metadata.drop_all(bind=engine)
+@pytest.fixture(scope="module", autouse=True)
+def block_outbound_http():
+    """
+    Fail any real HTTP request made through requests in this module.
+    
+    Tests that exercise the OAuth callbacks patch requests.post/get themselves;
+    anything that slips past those patches errors out instead of reaching the network.
+    """
+    def refuse(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("Outbound HTTP is disabled in tests")
+    
+    with patch("requests.adapters.HTTPAdapter.send", side_effect=refuse):
+        yield
 
 @pytest.fixture
-def test_user(client):
+def test_user(db_session):
     """Create a test user in the database"""
-    db = TestingSessionLocal()
     user = User(
         email="test@example.com",
         name="Test User",
@@ -44,17 +31,25 @@ def test_user(client):
         role="parent",
         verified_adult=True
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    yield user
-    db.close()
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def access_token(test_user):
+    """Access token for test_user"""
+    return create_access_token(data={"sub": str(test_user.id), "email": test_user.email})
+
+@pytest.fixture
+def refresh_token(test_user):
+    """Refresh token for test_user"""
+    return create_refresh_token(data={"sub": str(test_user.id), "email": test_user.email})
 
 
-def test_get_current_user_with_valid_token(client, test_user):
+def test_get_current_user_with_valid_token(client, test_user, access_token):
     """Test /auth/me endpoint with valid access token"""
-    access_token = create_access_token(data={"sub": str(test_user.id), "email": test_user.email})
-    
     response = client.get(
         "/api/v1/auth/me",
         headers={"Authorization": f"Bearer {access_token}"}
@@ -82,10 +77,8 @@ def test_get_current_user_with_invalid_token(client):
     assert response.status_code == 401
 
 
-def test_refresh_access_token_success(client, test_user):
+def test_refresh_access_token_success(client, test_user, refresh_token):
     """Test /auth/refresh endpoint with valid refresh token"""
-    refresh_token = create_refresh_token(data={"sub": str(test_user.id), "email": test_user.email})
-    
     response = client.post(
         "/api/v1/auth/refresh",
         headers={"Authorization": f"Bearer {refresh_token}"}
@@ -98,10 +91,8 @@ def test_refresh_access_token_success(client, test_user):
     assert data["user"]["email"] == test_user.email
 
 
-def test_refresh_with_access_token_fails(client, test_user):
+def test_refresh_with_access_token_fails(client, access_token):
     """Test /auth/refresh endpoint rejects access tokens"""
-    access_token = create_access_token(data={"sub": str(test_user.id), "email": test_user.email})
-    
     response = client.post(
         "/api/v1/auth/refresh",
         headers={"Authorization": f"Bearer {access_token}"}
@@ -187,6 +178,26 @@ def test_state_token_expiration():
         state_serializer.loads(state_token, max_age=-1)
 
 
+def test_load_state_verifies_repeated_token_once():
+    """Test that a state token seen twice is only verified the first time"""
+    state_token = state_serializer.dumps({
+        "provider": "google",
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    
+    with patch('app.api.v1.endpoints.auth.state_serializer.loads', wraps=state_serializer.loads) as mock_loads:
+        assert load_state(state_token)["provider"] == "google"
+        assert load_state(state_token)["provider"] == "google"
+    
+    assert mock_loads.call_count == 1
+
+
+def test_outbound_http_is_blocked():
+    """Test that unpatched requests calls never reach the network"""
+    with pytest.raises(requests.exceptions.ConnectionError):
+        requests.get("https://oauth2.googleapis.com/token")
+
+
 def test_google_login_redirects_to_google(client):
     """Test that /auth/google/login redirects to Google OAuth"""
     response = client.get("/api/v1/auth/google/login", follow_redirects=False)
@@ -1,75 +1,51 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
-from app.main import app
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
 from app.models.custody_event import CustodyEvent, CustodyEventType
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_custody.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-@pytest.fixture(scope="function")
-def db_setup():
-    """Create tables before each test and drop them after"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+@pytest.fixture
+def kit_factory(db_session):
+    """Return a callable that adds a kit inside the test SAVEPOINT"""
+    def create_kit(**fields):
+        kit = Kit(**{
+            "code": "TEST-001",
+            "name": "Test Kit",
+            "description": "A kit for testing",
+            "status": KitStatus.available,
+            **fields
+        })
+        db_session.add(kit)
+        db_session.commit()
+        return kit
+    return create_kit
 
 @pytest.fixture
-def client(db_setup):
-    """Create a test client"""
-    return TestClient(app)
+def coach_factory(db_session):
+    """Return a callable that adds a coach user inside the test SAVEPOINT"""
+    def create_coach(**fields):
+        user = User(**{
+            "email": "coach@test.com",
+            "name": "Test Coach",
+            "oauth_provider": "google",
+            "oauth_id": "test-coach-123",
+            "role": UserRole.coach,
+            "is_active": True,
+            **fields
+        })
+        db_session.add(user)
+        db_session.commit()
+        return user
+    return create_coach
 
 @pytest.fixture
-def sample_kit(db_setup):
+def sample_kit(kit_factory):
     """Create a sample kit for testing"""
-    db = TestingSessionLocal()
-    kit = Kit(
-        code="TEST-001",
-        name="Test Kit",
-        description="A kit for testing",
-        status=KitStatus.available
-    )
-    db.add(kit)
-    db.commit()
-    db.refresh(kit)
-    db.close()
-    return kit
+    return kit_factory()
 
 @pytest.fixture
-def sample_coach(db_setup):
+def sample_coach(coach_factory):
     """Create a sample coach user for testing"""
-    db = TestingSessionLocal()
-    user = User(
-        email="coach@test.com",
-        name="Test Coach",
-        oauth_provider="google",
-        oauth_id="test-coach-123",
-        role=UserRole.coach,
-        is_active=True
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    db.close()
-    return user
+    return coach_factory()
 
 def test_checkout_kit_success(client, sample_kit, sample_coach):
     """Test successful kit checkout"""
@@ -139,7 +115,7 @@ def test_checkout_kit_already_checked_out(client, sample_kit):
     assert response.status_code == 400
     assert "checked_out" in response.json()["detail"]
 
-def test_checkout_creates_event_record(client, sample_kit):
+def test_checkout_creates_event_record(client, sample_kit, db_session):
     """Test that checkout creates a custody event record"""
     response = client.post(
         "/api/v1/custody/checkout",
@@ -152,17 +128,15 @@ def test_checkout_creates_event_record(client, sample_kit):
     assert response.status_code == 201
     
     # Verify event was created in database
-    db = TestingSessionLocal()
-    event = db.query(CustodyEvent).filter(
+    event = db_session.query(CustodyEvent).filter(
         CustodyEvent.kit_id == sample_kit.id
     ).first()
     
     assert event is not None
     assert event.event_type == CustodyEventType.checkout_onprem
     assert event.custodian_name == "John Athlete"
-    db.close()
 
-def test_checkout_updates_kit_status(client, sample_kit):
+def test_checkout_updates_kit_status(client, sample_kit, db_session):
     """Test that checkout updates kit status"""
     response = client.post(
         "/api/v1/custody/checkout",
@@ -175,9 +149,110 @@ def test_checkout_updates_kit_status(client, sample_kit):
     assert response.status_code == 201
     
     # Verify kit status was updated
-    db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_kit.id).first()
+    kit = db_session.get(Kit, sample_kit.id)
     
     assert kit.status == KitStatus.checked_out
     assert kit.current_custodian_name == "John Athlete"
-    db.close()
+
+def test_bulk_checkout_success(client, sample_kit, sample_coach, kit_factory, db_session):
+    """Test checking out several kits in one request"""
+    kit_factory(code="TEST-002", name="Second Kit", description=None)
+    
+    response = client.post(
+        "/api/v1/custody/checkout/bulk",
+        json={
+            "checkouts": [
+                {"kit_code": "TEST-001", "custodian_name": "John Athlete", "notes": "Practice session"},
+                {"kit_code": "TEST-002", "custodian_name": "Jane Athlete", "custodian_id": sample_coach.id}
+            ]
+        }
+    )
+    
+    assert response.status_code == 201
+    data = response.json()
+    assert [c["kit_code"] for c in data["checkouts"]] == ["TEST-001", "TEST-002"]
+    assert data["checkouts"][0]["event"]["custodian_name"] == "John Athlete"
+    assert data["checkouts"][0]["event"]["notes"] == "Practice session"
+    assert data["checkouts"][1]["event"]["custodian_id"] == sample_coach.id
+    
+    # Verify each kit got its own custodian
+    kits = {kit.code: kit for kit in db_session.query(Kit).all()}
+    assert kits["TEST-001"].status == KitStatus.checked_out
+    assert kits["TEST-001"].current_custodian_name == "John Athlete"
+    assert kits["TEST-001"].current_custodian_id is None
+    assert kits["TEST-002"].current_custodian_name == "Jane Athlete"
+    assert kits["TEST-002"].current_custodian_id == sample_coach.id
+    assert db_session.query(CustodyEvent).count() == 2
+
+def test_bulk_checkout_is_all_or_nothing(client, sample_kit, db_session):
+    """Test that a bulk checkout with an unknown kit checks out nothing"""
+    response = client.post(
+        "/api/v1/custody/checkout/bulk",
+        json={
+            "checkouts": [
+                {"kit_code": "TEST-001", "custodian_name": "John Athlete"},
+                {"kit_code": "NONEXISTENT", "custodian_name": "Jane Athlete"}
+            ]
+        }
+    )
+    
+    assert response.status_code == 404
+    assert "NONEXISTENT" in response.json()["detail"]
+    
+    # Verify the valid kit was left untouched
+    kit = db_session.get(Kit, sample_kit.id)
+    assert kit.status == KitStatus.available
+    assert db_session.query(CustodyEvent).count() == 0
+
+def test_bulk_record_events_batches_inserts(db_session, sample_kit, sample_coach, monkeypatch):
+    """Test that backfilled events are written with one multi-row INSERT per batch"""
+    from sqlalchemy import event
+    from app.services import custody_service
+    
+    monkeypatch.setattr(custody_service, "EVENT_BATCH_SIZE", 2)
+    events = [
+        {
+            "event_type": CustodyEventType.checkout_onprem,
+            "kit_id": sample_kit.id,
+            "initiated_by_id": sample_coach.id,
+            "initiated_by_name": sample_coach.name,
+            "custodian_name": f"Athlete {i}",
+            "location_type": "on_premises"
+        }
+        for i in range(5)
+    ]
+    
+    inserts = []
+    def record_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append(statement)
+    
+    engine = db_session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", record_insert)
+    try:
+        assert custody_service.bulk_record_events(db_session, events) == 5
+    finally:
+        event.remove(engine, "before_cursor_execute", record_insert)
+    
+    assert len(inserts) == 3
+    names = [e.custodian_name for e in db_session.query(CustodyEvent).order_by(CustodyEvent.id)]
+    assert names == [f"Athlete {i}" for i in range(5)]
+
+def test_bulk_checkout_rejects_too_many_kits(client, sample_kit, db_session):
+    """Test that a bulk checkout over the per-request limit is rejected before touching kits"""
+    from app.schemas.custody_event import MAX_BULK_CHECKOUTS
+    
+    response = client.post(
+        "/api/v1/custody/checkout/bulk",
+        json={
+            "checkouts": [
+                {"kit_code": f"KIT-{i}", "custodian_name": "John Athlete"}
+                for i in range(MAX_BULK_CHECKOUTS + 1)
+            ]
+        }
+    )
+    
+    assert response.status_code == 422
+    
+    # Verify nothing was checked out
+    assert db_session.query(CustodyEvent).count() == 0
@@ -1,48 +1,13 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert
 from datetime import datetime, timedelta
-from app.database import Base, get_db
-from app.main import app
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
 from app.models.custody_event import CustodyEvent, CustodyEventType
 
-# Use file-based SQLite for testing with proper cleanup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_events.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-@pytest.fixture(scope="function")
-def db_setup():
-    """Create tables before each test and drop them after"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture
-def client(db_setup):
-    """Create a test client"""
-    return TestClient(app)
-
-@pytest.fixture
-def sample_data(db_setup):
-    """Create sample data for testing"""
-    db = TestingSessionLocal()
-    
+@pytest.fixture(scope="module")
+def sample_data(module_session):
+    """Create sample data once for this module; the event tests only read it"""
     # Create users
     coach = User(
         email="coach@test.com",
@@ -60,13 +25,10 @@ def sample_data(db_setup):
         role=UserRole.parent,
         is_active=True
     )
-    db.add(coach)
-    db.add(athlete)
-    db.commit()
-    db.refresh(coach)
-    db.refresh(athlete)
+    module_session.add_all([coach, athlete])
+    module_session.flush()
     
-    # Store IDs before creating other objects
+    # IDs are populated by the flush
     coach_id = coach.id
     athlete_id = athlete.id
     
@@ -83,11 +45,8 @@ def sample_data(db_setup):
         description="Second test kit",
         status=KitStatus.available
     )
-    db.add(kit1)
-    db.add(kit2)
-    db.commit()
-    db.refresh(kit1)
-    db.refresh(kit2)
+    module_session.add_all([kit1, kit2])
+    module_session.flush()
     
     # Store IDs
     kit1_id = kit1.id
@@ -96,64 +55,57 @@ def sample_data(db_setup):
     # Create custody events with different timestamps
     now = datetime.utcnow()
     
-    # Event 1: Coach checks out kit1 to athlete (3 days ago)
-    event1 = CustodyEvent(
-        event_type=CustodyEventType.checkout_onprem,
-        kit_id=kit1_id,
-        initiated_by_id=coach_id,
-        initiated_by_name=coach.name,
-        custodian_id=athlete_id,
-        custodian_name=athlete.name,
-        notes="Practice session",
-        location_type="on_premises"
-    )
-    event1.created_at = now - timedelta(days=3)
-    db.add(event1)
-    
-    # Event 2: Athlete checks in kit1 (2 days ago)
-    event2 = CustodyEvent(
-        event_type=CustodyEventType.checkin,
-        kit_id=kit1_id,
-        initiated_by_id=athlete_id,
-        initiated_by_name=athlete.name,
-        custodian_id=coach_id,
-        custodian_name=coach.name,
-        notes="Returned after practice",
-        location_type="on_premises"
-    )
-    event2.created_at = now - timedelta(days=2)
-    db.add(event2)
-    
-    # Event 3: Coach checks out kit1 to athlete off-site (1 day ago)
-    event3 = CustodyEvent(
-        event_type=CustodyEventType.checkout_offsite,
-        kit_id=kit1_id,
-        initiated_by_id=coach_id,
-        initiated_by_name=coach.name,
-        custodian_id=athlete_id,
-        custodian_name=athlete.name,
-        notes="Competition",
-        location_type="off_site"
-    )
-    event3.created_at = now - timedelta(days=1)
-    db.add(event3)
-    
-    # Event 4: Coach checks out kit2 to athlete (5 hours ago)
-    event4 = CustodyEvent(
-        event_type=CustodyEventType.checkout_onprem,
-        kit_id=kit2_id,
-        initiated_by_id=coach_id,
-        initiated_by_name=coach.name,
-        custodian_id=athlete_id,
-        custodian_name=athlete.name,
-        notes="Training",
-        location_type="on_premises"
-    )
-    event4.created_at = now - timedelta(hours=5)
-    db.add(event4)
-    
-    db.commit()
-    db.close()
+    module_session.execute(insert(CustodyEvent), [
+        # Event 1: Coach checks out kit1 to athlete (3 days ago)
+        {
+            "event_type": CustodyEventType.checkout_onprem,
+            "kit_id": kit1_id,
+            "initiated_by_id": coach_id,
+            "initiated_by_name": coach.name,
+            "custodian_id": athlete_id,
+            "custodian_name": athlete.name,
+            "notes": "Practice session",
+            "location_type": "on_premises",
+            "created_at": now - timedelta(days=3)
+        },
+        # Event 2: Athlete checks in kit1 (2 days ago)
+        {
+            "event_type": CustodyEventType.checkin,
+            "kit_id": kit1_id,
+            "initiated_by_id": athlete_id,
+            "initiated_by_name": athlete.name,
+            "custodian_id": coach_id,
+            "custodian_name": coach.name,
+            "notes": "Returned after practice",
+            "location_type": "on_premises",
+            "created_at": now - timedelta(days=2)
+        },
+        # Event 3: Coach checks out kit1 to athlete off-site (1 day ago)
+        {
+            "event_type": CustodyEventType.checkout_offsite,
+            "kit_id": kit1_id,
+            "initiated_by_id": coach_id,
+            "initiated_by_name": coach.name,
+            "custodian_id": athlete_id,
+            "custodian_name": athlete.name,
+            "notes": "Competition",
+            "location_type": "off_site",
+            "created_at": now - timedelta(days=1)
+        },
+        # Event 4: Coach checks out kit2 to athlete (5 hours ago)
+        {
+            "event_type": CustodyEventType.checkout_onprem,
+            "kit_id": kit2_id,
+            "initiated_by_id": coach_id,
+            "initiated_by_name": coach.name,
+            "custodian_id": athlete_id,
+            "custodian_name": athlete.name,
+            "notes": "Training",
+            "location_type": "on_premises",
+            "created_at": now - timedelta(hours=5)
+        }
+    ])
+    module_session.commit()
     
     return {
         "coach_id": coach_id,
@@ -212,25 +164,6 @@ def test_get_kit_events_not_found(client, sample_data):
     assert "Kit not found" in response.json()["detail"]
 
 
-def test_get_kit_events_with_event_type_filter(client, sample_data):
-    """Test filtering kit events by event type"""
-    kit_id = sample_data["kit1_id"]
-    
-    # Filter for checkout_onprem events
-    response = client.get(
-        f"/api/v1/events/kit/{kit_id}",
-        params={"event_type": "checkout_onprem"}
-    )
-    
-    assert response.status_code == 200
-    data = response.json()
-    
-    # Should only have 1 checkout_onprem event for kit1
-    assert data["total"] == 1
-    assert len(data["events"]) == 1
-    assert data["events"][0]["event_type"] == "checkout_onprem"
-
-
 def test_get_kit_events_with_sorting(client, sample_data):
     """Test sorting kit events"""
     kit_id = sample_data["kit1_id"]
@@ -249,35 +182,6 @@ def test_get_kit_events_with_sorting(client, sample_data):
     assert timestamps == sorted(timestamps)
 
 
-def test_get_kit_events_with_pagination(client, sample_data):
-    """Test pagination of kit events"""
-    kit_id = sample_data["kit1_id"]
-    
-    # Get first page with limit 2
-    response = client.get(
-        f"/api/v1/events/kit/{kit_id}",
-        params={"skip": 0, "limit": 2}
-    )
-    
-    assert response.status_code == 200
-    data = response.json()
-    
-    assert data["total"] == 3  # Total is 3
-    assert len(data["events"]) == 2  # But we only get 2 results
-    
-    # Get second page
-    response2 = client.get(
-        f"/api/v1/events/kit/{kit_id}",
-        params={"skip": 2, "limit": 2}
-    )
-    
-    assert response2.status_code == 200
-    data2 = response2.json()
-    
-    assert data2["total"] == 3
-    assert len(data2["events"]) == 1  # Only 1 result left
-
-
 def test_get_user_events_success(client, sample_data):
     """Test successful retrieval of user events"""
     athlete_id = sample_data["athlete_id"]
@@ -330,20 +234,23 @@ def test_get_user_events_as_coach(client, sample_data):
     assert data["user_name"] == "Test Coach"
 
 
-def test_get_user_events_with_filters(client, sample_data):
-    """Test filtering user events"""
-    athlete_id = sample_data["athlete_id"]
-    
-    # Filter for checkout_offsite events only
-    response = client.get(
-        f"/api/v1/events/user/{athlete_id}",
-        params={"event_type": "checkout_offsite"}
-    )
+@pytest.mark.parametrize("path,owner_key,params,expected_total,expected_len", [
+    # kit1 has 1 checkout_onprem event
+    ("kit", "kit1_id", {"event_type": "checkout_onprem"}, 1, 1),
+    # kit1 has 3 events: a first page of 2, then the 1 left
+    ("kit", "kit1_id", {"skip": 0, "limit": 2}, 3, 2),
+    ("kit", "kit1_id", {"skip": 2, "limit": 2}, 3, 1),
+    # The athlete has 1 checkout_offsite event
+    ("user", "athlete_id", {"event_type": "checkout_offsite"}, 1, 1),
+], ids=["kit_event_type_filter", "kit_first_page", "kit_second_page", "user_event_type_filter"])
+def test_get_events_with_query_params(client, sample_data, path, owner_key, params, expected_total, expected_len):
+    """Test filtering and paginating kit and user events"""
+    response = client.get(f"/api/v1/events/{path}/{sample_data[owner_key]}", params=params)
     
     assert response.status_code == 200
     data = response.json()
     
-    # Should only have 1 checkout_offsite event
-    assert data["total"] == 1
-    assert len(data["events"]) == 1
-    assert data["events"][0]["event_type"] == "checkout_offsite"
+    assert data["total"] == expected_total
+    assert len(data["events"]) == expected_len
+    if "event_type" in params:
+        assert all(event["event_type"] == params["event_type"] for event in data["events"])
@@ -402,3 +402,142 @@ def test_export_empty_results(client, db_session):
     reader = csv.DictReader(csv_content)
     rows = list(reader)
     assert len(rows) == 0
+
+
+@pytest.mark.parametrize("export_format", ["csv", "json"])
+def test_export_spans_multiple_batches(client, db_session, monkeypatch, export_format):
+    """Test that streamed exports include every event when they span several batches"""
+    from app.services import export_service
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 2)
+    
+    # Create admin user
+    admin = User(
+        email="admin@example.com",
+        name="Test Admin",
+        oauth_provider="google",
+        oauth_id="test-admin-id",
+        role=UserRole.admin,
+        is_active=True
+    )
+    db_session.add(admin)
+    
+    # Create kit
+    kit = Kit(
+        code="KIT001",
+        name="Test Kit",
+        description="Test kit for export",
+        status=KitStatus.checked_out
+    )
+    db_session.add(kit)
+    db_session.commit()
+    
+    # Create more events than fit in a single batch
+    for i in range(5):
+        db_session.add(CustodyEvent(
+            event_type=CustodyEventType.checkout_onprem,
+            kit_id=kit.id,
+            initiated_by_id=admin.id,
+            initiated_by_name=admin.name,
+            custodian_name=f"Athlete {i}",
+            location_type="on_premises"
+        ))
+    db_session.commit()
+    
+    response = client.get(f"/api/v1/custody/export?format={export_format}")
+    
+    assert response.status_code == 200
+    if export_format == "csv":
+        rows = list(csv.DictReader(StringIO(response.text)))
+    else:
+        rows = json.loads(response.text)
+    assert sorted(row["custodian_name"] for row in rows) == [f"Athlete {i}" for i in range(5)]
+
+
+def test_export_csv_quotes_free_text_fields(client, db_session):
+    """Test that names, notes and locations containing CSV special characters round-trip"""
+    # Create admin user
+    admin = User(
+        email="admin@example.com",
+        name="Admin, Test",
+        oauth_provider="google",
+        oauth_id="test-admin-id",
+        role=UserRole.admin,
+        is_active=True
+    )
+    db_session.add(admin)
+    
+    # Create kit
+    kit = Kit(
+        code="KIT001",
+        name="Test Kit",
+        description="Test kit for export",
+        status=KitStatus.checked_out
+    )
+    db_session.add(kit)
+    db_session.commit()
+    
+    db_session.add(CustodyEvent(
+        event_type=CustodyEventType.checkout_onprem,
+        kit_id=kit.id,
+        initiated_by_id=admin.id,
+        initiated_by_name=admin.name,
+        custodian_name='John "JJ" Doe',
+        notes="Left at range,\nback tomorrow",
+        location_type="off_site, north range"
+    ))
+    db_session.commit()
+    
+    response = client.get("/api/v1/custody/export?format=csv")
+    
+    assert response.status_code == 200
+    rows = list(csv.DictReader(StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["initiated_by_name"] == "Admin, Test"
+    assert rows[0]["custodian_name"] == 'John "JJ" Doe'
+    assert rows[0]["notes"] == "Left at range,\nback tomorrow"
+    assert rows[0]["location_type"] == "off_site, north range"
+    assert rows[0]["custodian_id"] == ""
+
+
+def test_export_session_open_while_streaming(client, db_session, monkeypatch):
+    """Test that the export query runs on a session that is only closed once the stream ends"""
+    from app.services import export_service
+    
+    admin = User(
+        email="admin@example.com",
+        name="Test Admin",
+        oauth_provider="google",
+        oauth_id="test-admin-id",
+        role=UserRole.admin,
+        is_active=True
+    )
+    db_session.add(admin)
+    db_session.commit()
+    
+    log = []
+    export_sessions = []
+    
+    real_session_local = export_service.SessionLocal
+    def logging_session_local(**kwargs):
+        session = real_session_local(**kwargs)
+        real_close = session.close
+        def close():
+            log.append("close")
+            real_close()
+        session.close = close
+        export_sessions.append(session)
+        return session
+    
+    real_execute_export_query = export_service._execute_export_query
+    def logging_execute_export_query(db, start_date=None, end_date=None):
+        assert db in export_sessions
+        log.append("export-select")
+        return real_execute_export_query(db, start_date, end_date)
+    
+    monkeypatch.setattr(export_service, "SessionLocal", logging_session_local)
+    monkeypatch.setattr(export_service, "_execute_export_query", logging_execute_export_query)
+    
+    response = client.get("/api/v1/custody/export?format=csv")
+    
+    assert response.status_code == 200
+    assert log == ["export-select", "close"]
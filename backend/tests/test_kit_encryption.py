@@ -4,15 +4,16 @@ Integration tests for encrypted serial number field in Kit model (AUDIT-003)
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database import Base
 from app.models.kit import Kit, KitStatus
 
 
 # Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_encryption.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -67,7 +68,7 @@ class TestKitSerialNumberEncryption:
         db_session.expunge_all()
         
         # Retrieve the kit
-        retrieved_kit = db_session.query(Kit).filter(Kit.id == kit_id).first()
+        retrieved_kit = db_session.get(Kit, kit_id)
         
         # Serial number should be decrypted automatically
         assert retrieved_kit.serial_number == "SN-67890-XYZ"
@@ -9,7 +9,7 @@ def test_lookup_kit_success(client, db_session):
         code="TEST001",
         name="Test Kit",
         description="A test kit for unit testing",
-        status=KitStatus.AVAILABLE,
+        status=KitStatus.available,
         current_custodian_name=None
     )
     db_session.add(test_kit)
@@ -34,7 +34,7 @@ def test_lookup_kit_with_custodian(client, db_session):
         code="TEST002",
         name="Checked Out Kit",
         description="A kit that is checked out",
-        status=KitStatus.CHECKED_OUT,
+        status=KitStatus.checked_out,
         current_custodian_name="John Doe"
     )
     db_session.add(test_kit)
@@ -57,7 +57,7 @@ def test_lookup_kit_in_maintenance(client, db_session):
         code="TEST003",
         name="Maintenance Kit",
         description="A kit in maintenance",
-        status=KitStatus.IN_MAINTENANCE,
+        status=KitStatus.in_maintenance,
         current_custodian_name=None
     )
     db_session.add(test_kit)
@@ -95,7 +95,7 @@ def test_lookup_kit_manual_entry(client, db_session):
         code="MANUAL-123",
         name="Manual Entry Kit",
         description="A kit entered manually",
-        status=KitStatus.AVAILABLE
+        status=KitStatus.available
     )
     db_session.add(test_kit)
     db_session.commit()
@@ -108,3 +108,48 @@ def test_lookup_kit_manual_entry(client, db_session):
     data = response.json()
     assert data["code"] == "MANUAL-123"
     assert data["name"] == "Manual Entry Kit"
+
+def test_lookup_by_code_cache_invalidated_on_checkout(db_session):
+    """Test that repeated lookups are cached and custody writes invalidate them"""
+    from app.models.user import User, UserRole
+    from app.services.kit_service import KitService
+    from app.services.custody_service import checkout_kit_onprem
+    
+    KitService.invalidate_lookup("TEST006")
+    test_kit = Kit(
+        code="TEST006",
+        name="Cached Kit",
+        status=KitStatus.available
+    )
+    coach = User(
+        email="coach@test.com",
+        name="Test Coach",
+        oauth_provider="google",
+        oauth_id="test-coach-123",
+        role=UserRole.coach
+    )
+    db_session.add_all([test_kit, coach])
+    db_session.commit()
+    
+    # Repeated scans are served from the cache
+    first = KitService.lookup_by_code(db_session, "TEST006")
+    assert KitService.lookup_by_code(db_session, "TEST006") is first
+    assert first.status == KitStatus.available
+    
+    # Checking the kit out invalidates the cached lookup
+    checkout_kit_onprem(
+        db=db_session,
+        kit_code="TEST006",
+        custodian_name="John Doe",
+        initiated_by_user=coach
+    )
+    lookup = KitService.lookup_by_code(db_session, "TEST006")
+    assert lookup.status == KitStatus.checked_out
+    assert lookup.custodian == "John Doe"
+    
+    # Rows widen to the API schema at the response boundary
+    response = KitLookupResponse.model_validate(lookup)
+    assert response.code == "TEST006"
+    assert response.custodian == "John Doe"
+    
+    KitService.invalidate_lookup("TEST006")
@@ -2,15 +2,16 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
 from app.main import app
 from app.models import Kit, KitItem  # Import from app.models to ensure all models are loaded
 
 # Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,13 +22,13 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 @pytest.fixture(scope="function")
 def db_setup():
-    """Create tables before each test and drop them after"""
+    """Create tables and point get_db at them before each test, undo both after"""
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
@@ -57,12 +58,21 @@ def test_create_kit(client):
     assert "created_at" in data
     assert "updated_at" in data
 
+def test_create_kit_duplicate_code(client):
+    """Test that a second kit with the same code is rejected"""
+    kit_data = {"code": "DUP-001", "name": "Original Kit"}
+    assert client.post("/api/v1/kits/", json=kit_data).status_code == 201
+    
+    response = client.post("/api/v1/kits/", json={"code": "DUP-001", "name": "Copy Kit"})
+    assert response.status_code == 400
+    assert "already exists" in response.json()["detail"]
+
 def test_list_kits(client):
     """Test listing kits"""
     # Create a kit first
     client.post(
         "/api/v1/kits/",
-        json={"code": "KIT-001", "name": "Kit 1", "description": "First kit"}
+        json={"code": "KIT-001", "name": "Kit 1", "description": "First kit", "serial_number": "SN-001"}
     )
     client.post(
         "/api/v1/kits/",
@@ -75,6 +85,8 @@ def test_list_kits(client):
     assert len(data) == 2
     assert data[0]["name"] == "Kit 1"
     assert data[1]["name"] == "Kit 2"
+    assert data[0]["serial_number"] == "SN-001"
+    assert data[1]["serial_number"] is None
 
 def test_get_kit_by_id(client):
     """Test getting a kit by ID"""
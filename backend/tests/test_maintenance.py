@@ -2,16 +2,17 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
 from app.main import app
 from app.models.kit import Kit, KitStatus
 from app.models.user import User, UserRole
 
 # Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_maintenance.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -24,14 +25,13 @@ def override_get_db():
         db.close()
 
 
-app.dependency_overrides[get_db] = override_get_db
-
-
 @pytest.fixture(scope="function")
 def db_setup():
-    """Create tables before each test and drop them after"""
+    """Create tables and point get_db at them before each test, undo both after"""
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
 
@@ -185,6 +185,52 @@ def test_close_maintenance_not_in_maintenance(client, sample_kit, sample_armorer
     assert "not in maintenance" in response.json()["detail"]
 
 
+def test_close_maintenance_without_open_event_leaves_kit_unchanged(client, sample_kit, sample_armorer):
+    """Test that closing fails without changing the kit when no maintenance event is open"""
+    db = TestingSessionLocal()
+    kit = db.get(Kit, sample_kit.id)
+    kit.status = KitStatus.in_maintenance
+    db.commit()
+    db.close()
+    
+    response = client.post(
+        "/api/v1/maintenance/close",
+        json={
+            "kit_code": sample_kit.code,
+            "notes": "Close maintenance",
+            "next_maintenance_days": 30
+        }
+    )
+    
+    assert response.status_code == 400
+    assert "No open maintenance event" in response.json()["detail"]
+    
+    # Verify the kit was not updated
+    db = TestingSessionLocal()
+    kit = db.get(Kit, sample_kit.id)
+    assert kit.status == KitStatus.in_maintenance
+    assert kit.next_maintenance_date is None
+    db.close()
+
+def test_close_maintenance_without_open_event_keeps_pending_work(sample_kit, sample_armorer):
+    """Test that a failed close does not roll back the caller's other pending changes"""
+    from fastapi import HTTPException
+    from app.services.maintenance_service import close_maintenance
+    
+    db = TestingSessionLocal()
+    kit = db.get(Kit, sample_kit.id)
+    kit.status = KitStatus.in_maintenance
+    db.commit()
+    
+    pending_kit = Kit(code="PENDING-001", name="Pending Kit", status=KitStatus.available)
+    db.add(pending_kit)
+    
+    with pytest.raises(HTTPException, match="No open maintenance event"):
+        close_maintenance(db, sample_kit.code, db.get(User, sample_armorer.id))
+    
+    assert pending_kit in db.new
+    db.close()
+
 def test_close_maintenance_kit_not_found(client, sample_armorer):
     """Test closing maintenance on a non-existent kit"""
     response = client.post(
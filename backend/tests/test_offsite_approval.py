@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime, timezone
 from app.database import Base, get_db
 from app.main import app
@@ -12,10 +13,10 @@ from app.models.custody_event import CustodyEvent, CustodyEventType
 from app.constants import ATTESTATION_TEXT
 
 # Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_offsite_approval.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -26,13 +27,13 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 @pytest.fixture(scope="function")
 def db_setup():
-    """Create tables before each test and drop them after"""
+    """Create tables and point get_db at them before each test, undo both after"""
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
@@ -206,7 +207,7 @@ def test_offsite_request_kit_not_available(client, sample_kit, verified_parent):
     """Test off-site checkout request when kit is already checked out"""
     # First, mark the kit as checked out
     db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_kit.id).first()
+    kit = db.get(Kit, sample_kit.id)
     kit.status = KitStatus.checked_out
     db.commit()
     db.close()
@@ -276,7 +277,7 @@ def test_approve_offsite_request_by_armorer(client, sample_kit, verified_parent,
     
     # Verify kit status updated
     db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_kit.id).first()
+    kit = db.get(Kit, sample_kit.id)
     assert kit.status == KitStatus.checked_out
     assert kit.current_custodian_name == "Child Athlete"
     db.close()
@@ -371,7 +372,7 @@ def test_deny_offsite_request(client, sample_kit, verified_parent, armorer):
     
     # Verify kit is still available
     db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_kit.id).first()
+    kit = db.get(Kit, sample_kit.id)
     assert kit.status == KitStatus.available
     db.close()
 
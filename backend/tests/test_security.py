@@ -1,6 +1,10 @@
 import pytest
 from datetime import datetime, timezone, timedelta
+from jose import jwt
 from app.core.security import create_access_token, create_refresh_token, verify_token
+from app.core.security import StateSigner, BadSignature
+from unittest.mock import patch
+import time
 
 
 def test_create_access_token():
@@ -93,3 +97,43 @@ def test_refresh_token_expiry():
     refresh_payload = verify_token(refresh_token)
     
     assert access_payload["exp"] < refresh_payload["exp"]
+
+
+def test_state_signer_rejects_tampered_payload():
+    """Test that changing the payload of a signed state token invalidates it."""
+    signer = StateSigner("test-secret")
+    token = signer.dumps({"provider": "google"})
+    forged_payload = signer.dumps({"provider": "microsoft"}).split(".")[0]
+    
+    with pytest.raises(BadSignature):
+        signer.loads(forged_payload + "." + token.split(".")[1])
+
+
+def test_state_signer_rejects_other_key():
+    """Test that a state token signed with a different key is rejected."""
+    token = StateSigner("other-secret").dumps({"provider": "google"})
+    
+    with pytest.raises(BadSignature):
+        StateSigner("test-secret").loads(token, max_age=600)
+
+
+def test_verify_token_reuses_verified_claims():
+    """Test that verifying the same token twice only decodes it once."""
+    token = create_access_token({"sub": "cached-user"})
+    
+    with patch("app.core.security.jwt.decode", wraps=jwt.decode) as mock_decode:
+        assert verify_token(token)["sub"] == "cached-user"
+        assert verify_token(token)["sub"] == "cached-user"
+    
+    assert mock_decode.call_count == 1
+
+
+def test_verify_token_cached_claims_respect_expiry():
+    """Test that a cached token is rejected once it has expired."""
+    token = create_access_token({"sub": "expiring-user"}, expires_delta=timedelta(minutes=5))
+    assert verify_token(token) is not None
+    
+    later = time.time() + 600
+    with patch("app.core.security.time.time", return_value=later):
+        assert verify_token(token) is None
+
@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
 from app.main import app
 from app.models.kit import Kit, KitStatus
@@ -9,10 +10,10 @@ from app.models.user import User, UserRole
 from app.models.custody_event import CustodyEvent, CustodyEventType
 
 # Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_transfer_custody.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -23,13 +24,13 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 @pytest.fixture(scope="function")
 def db_setup():
-    """Create tables before each test and drop them after"""
+    """Create tables and point get_db at them before each test, undo both after"""
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
@@ -190,7 +191,7 @@ def test_transfer_updates_kit_custodian(client, sample_checked_out_kit):
     
     # Verify kit custodian was updated
     db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_checked_out_kit.id).first()
+    kit = db.get(Kit, sample_checked_out_kit.id)
     
     assert kit.status == KitStatus.checked_out
     assert kit.current_custodian_name == "Jane Athlete"
@@ -211,7 +212,7 @@ def test_transfer_with_custodian_id(client, sample_checked_out_kit):
     
     # Verify custodian_id was stored
     db = TestingSessionLocal()
-    kit = db.query(Kit).filter(Kit.id == sample_checked_out_kit.id).first()
+    kit = db.get(Kit, sample_checked_out_kit.id)
     
     assert kit.current_custodian_id == 42
     assert kit.current_custodian_name == "Jane Athlete"
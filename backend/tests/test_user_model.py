@@ -329,3 +329,111 @@ def test_query_verified_adults(db_session):
     verified_adults = db_session.query(User).filter(User.verified_adult == True).all()
     assert len(verified_adults) == 2
     assert all(user.verified_adult for user in verified_adults)
+
+
+def test_get_or_create_user_returns_existing_user(db_session):
+    """Test that a second login for the same OAuth identity returns the same user unchanged"""
+    from app.services.user_service import get_or_create_user
+    
+    user = get_or_create_user(db_session, "google", "google_login_1", "login@example.com", "First Name")
+    assert user.id is not None
+    assert user.role == UserRole.parent
+    assert user.verified_adult is False
+    assert user.is_active is True
+    
+    again = get_or_create_user(db_session, "google", "google_login_1", "changed@example.com", "Changed Name")
+    assert again.id == user.id
+    assert again.email == "login@example.com"
+    assert again.name == "First Name"
+    assert db_session.query(User).count() == 1
+    
+    # The same ID from another provider is a different identity
+    other = get_or_create_user(db_session, "microsoft", "google_login_1", "other@example.com", "Other")
+    assert other.id != user.id
+
+
+def test_get_or_create_user_fallback_handles_concurrent_insert(db_session, monkeypatch):
+    """Test that the check-then-insert fallback returns the winner of a concurrent insert"""
+    from app.services import user_service
+    
+    existing = User(
+        email="race@example.com",
+        name="Race Winner",
+        oauth_provider="google",
+        oauth_id="google_race"
+    )
+    db_session.add(existing)
+    db_session.commit()
+    
+    # The first lookup misses, as if the other login inserted just after it
+    real_get_user_by_oauth = user_service.get_user_by_oauth
+    lookups = []
+    def racing_get_user_by_oauth(db, provider, oauth_id):
+        lookups.append(oauth_id)
+        if len(lookups) == 1:
+            return None
+        return real_get_user_by_oauth(db, provider, oauth_id)
+    monkeypatch.setattr(user_service, "get_user_by_oauth", racing_get_user_by_oauth)
+    
+    user = user_service._get_or_create_user_fallback(
+        db_session, "google", "google_race", "race@example.com", "Race Loser"
+    )
+    
+    assert user.id == existing.id
+    assert user.name == "Race Winner"
+    assert len(lookups) == 2
+
+
+def test_get_or_create_user_existing_login_writes_nothing(db_session):
+    """Test that logging in as an existing user only reads the users table"""
+    from sqlalchemy import event
+    from app.services.user_service import get_or_create_user
+    
+    user = get_or_create_user(db_session, "google", "google_login_2", "login2@example.com", "Returning User")
+    
+    statements = []
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+    
+    engine = db_session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        again = get_or_create_user(db_session, "google", "google_login_2", "login2@example.com", "Returning User")
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+    
+    assert again.id == user.id
+    assert not {"INSERT", "UPDATE"} & set(statements)
+
+
+def test_get_or_create_user_returns_winner_of_concurrent_insert(db_session, monkeypatch):
+    """Test that an insert losing the ON CONFLICT race returns the user the other login created"""
+    from app.services import user_service
+    
+    existing = User(
+        email="race2@example.com",
+        name="Race Winner",
+        oauth_provider="google",
+        oauth_id="google_race_2"
+    )
+    db_session.add(existing)
+    db_session.commit()
+    
+    # The first lookup misses, as if the other login inserted just after it
+    real_get_user_by_oauth = user_service.get_user_by_oauth
+    lookups = []
+    def racing_get_user_by_oauth(db, provider, oauth_id):
+        lookups.append(oauth_id)
+        if len(lookups) == 1:
+            return None
+        return real_get_user_by_oauth(db, provider, oauth_id)
+    monkeypatch.setattr(user_service, "get_user_by_oauth", racing_get_user_by_oauth)
+    
+    user = user_service.get_or_create_user(
+        db_session, "google", "google_race_2", "race2@example.com", "Race Loser"
+    )
+    
+    assert user.id == existing.id
+    assert user.name == "Race Winner"
+    assert len(lookups) == 2
+    assert db_session.query(User).filter(User.oauth_id == "google_race_2").count() == 1
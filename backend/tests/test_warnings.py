@@ -34,9 +34,9 @@ def test_no_warnings_for_available_kit(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have no warnings
-    assert warnings["has_warning"] is False
-    assert warnings["overdue_return"] is False
-    assert warnings["extended_custody"] is False
+    assert warnings.has_warning is False
+    assert warnings.overdue_return is False
+    assert warnings.extended_custody is False
 
 
 def test_overdue_return_warning(db_session: Session):
@@ -80,10 +80,10 @@ def test_overdue_return_warning(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have overdue warning
-    assert warnings["has_warning"] is True
-    assert warnings["overdue_return"] is True
-    assert warnings["days_overdue"] == 5
-    assert warnings["expected_return_date"] == past_date
+    assert warnings.has_warning is True
+    assert warnings.overdue_return is True
+    assert warnings.days_overdue == 5
+    assert warnings.expected_return_date == past_date
 
 
 def test_extended_custody_warning(db_session: Session):
@@ -131,9 +131,9 @@ def test_extended_custody_warning(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have extended custody warning
-    assert warnings["has_warning"] is True
-    assert warnings["extended_custody"] is True
-    assert warnings["days_checked_out"] >= EXTENDED_CUSTODY_WARNING_DAYS
+    assert warnings.has_warning is True
+    assert warnings.extended_custody is True
+    assert warnings.days_checked_out >= EXTENDED_CUSTODY_WARNING_DAYS
 
 
 def test_no_warning_for_recent_checkout(db_session: Session):
@@ -175,9 +175,9 @@ def test_no_warning_for_recent_checkout(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have no warnings (not overdue, not extended yet)
-    assert warnings["has_warning"] is False
-    assert warnings["overdue_return"] is False
-    assert warnings["extended_custody"] is False
+    assert warnings.has_warning is False
+    assert warnings.overdue_return is False
+    assert warnings.extended_custody is False
 
 
 def test_get_all_kits_with_warnings(db_session: Session):
@@ -280,8 +280,8 @@ def test_future_expected_return_no_warning(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should not have overdue warning (future date)
-    assert warnings["overdue_return"] is False
-    assert warnings["expected_return_date"] == future_date
+    assert warnings.overdue_return is False
+    assert warnings.expected_return_date == future_date
 
 
 def test_overdue_maintenance_warning(db_session: Session):
@@ -301,10 +301,10 @@ def test_overdue_maintenance_warning(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have overdue maintenance warning
-    assert warnings["has_warning"] is True
-    assert warnings["overdue_maintenance"] is True
-    assert warnings["days_maintenance_overdue"] == 5
-    assert warnings["next_maintenance_date"] == past_date
+    assert warnings.has_warning is True
+    assert warnings.overdue_maintenance is True
+    assert warnings.days_maintenance_overdue == 5
+    assert warnings.next_maintenance_date == past_date
 
 
 def test_no_maintenance_warning_for_future_date(db_session: Session):
@@ -324,9 +324,9 @@ def test_no_maintenance_warning_for_future_date(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should not have maintenance warning
-    assert warnings["has_warning"] is False
-    assert warnings["overdue_maintenance"] is False
-    assert warnings["next_maintenance_date"] == future_date
+    assert warnings.has_warning is False
+    assert warnings.overdue_maintenance is False
+    assert warnings.next_maintenance_date == future_date
 
 
 def test_no_maintenance_warning_when_in_maintenance(db_session: Session):
@@ -346,8 +346,8 @@ def test_no_maintenance_warning_when_in_maintenance(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should not have maintenance warning (kit is already in maintenance)
-    assert warnings["has_warning"] is False
-    assert warnings["overdue_maintenance"] is False
+    assert warnings.has_warning is False
+    assert warnings.overdue_maintenance is False
 
 
 def test_maintenance_warning_with_checked_out_kit(db_session: Session):
@@ -391,9 +391,128 @@ def test_maintenance_warning_with_checked_out_kit(db_session: Session):
     warnings = calculate_kit_warnings(kit, db_session)
     
     # Should have maintenance warning but not custody warnings
-    assert warnings["has_warning"] is True
-    assert warnings["overdue_maintenance"] is True
-    assert warnings["days_maintenance_overdue"] == 3
+    assert warnings.has_warning is True
+    assert warnings.overdue_maintenance is True
+    assert warnings.days_maintenance_overdue == 3
     # Should not have custody warnings (recent checkout, no expected return)
-    assert warnings["overdue_return"] is False
-    assert warnings["extended_custody"] is False
+    assert warnings.overdue_return is False
+    assert warnings.extended_custody is False
+
+
+def test_get_all_kits_with_warnings_batches_checkout_queries(db_session: Session):
+    """Test that kits with warnings and their latest checkouts are loaded in one query"""
+    from sqlalchemy import event
+    
+    user = User(
+        email="test@example.com",
+        name="Test User",
+        oauth_provider="google",
+        oauth_id="test-123",
+        role=UserRole.coach
+    )
+    kits = [
+        Kit(code=f"TEST-B{i}", name=f"Kit {i}", status=KitStatus.checked_out, current_custodian_name="Alice")
+        for i in range(3)
+    ]
+    on_time_kit = Kit(code="TEST-B3", name="On Time Kit", status=KitStatus.checked_out, current_custodian_name="Bob")
+    db_session.add_all([user, *kits, on_time_kit])
+    db_session.commit()
+    
+    # A recent checkout that is not yet due back
+    db_session.add(CustodyEvent(
+        event_type=CustodyEventType.checkout_onprem,
+        kit_id=on_time_kit.id,
+        initiated_by_id=user.id,
+        initiated_by_name=user.name,
+        custodian_name="Bob",
+        expected_return_date=date.today() + timedelta(days=1)
+    ))
+    
+    # Each kit has an older on-time checkout and a newer overdue one
+    past_date = date.today() - timedelta(days=OVERDUE_RETURN_WARNING_DAYS + 1)
+    for kit in kits:
+        for created_at, expected_return_date in (
+            (datetime.now() - timedelta(days=2), date.today() + timedelta(days=7)),
+            (datetime.now() - timedelta(days=1), past_date)
+        ):
+            db_session.add(CustodyEvent(
+                event_type=CustodyEventType.checkout_onprem,
+                kit_id=kit.id,
+                initiated_by_id=user.id,
+                initiated_by_name=user.name,
+                custodian_name="Alice",
+                expected_return_date=expected_return_date,
+                created_at=created_at
+            ))
+    db_session.commit()
+    db_session.expire_all()
+    
+    selects = []
+    def record_select(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+    
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record_select)
+    try:
+        kits_with_warnings = get_all_kits_with_warnings(db_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", record_select)
+    
+    # Kits and their latest checkouts come back together, already filtered
+    assert len(selects) == 1
+    assert {k["kit_code"] for k in kits_with_warnings} == {"TEST-B0", "TEST-B1", "TEST-B2"}
+    for kit_warning in kits_with_warnings:
+        assert kit_warning["warnings"].overdue_return is True
+        assert kit_warning["warnings"].expected_return_date == past_date
+
+
+def test_get_all_kits_with_warnings_includes_overdue_maintenance(db_session: Session):
+    """Test that kits with overdue maintenance are reported even when not checked out"""
+    past_date = date.today() - timedelta(days=OVERDUE_MAINTENANCE_WARNING_DAYS + 3)
+    future_date = date.today() + timedelta(days=30)
+    overdue_kit = Kit(code="TEST-M1", name="Overdue Maint", status=KitStatus.available, next_maintenance_date=past_date)
+    lost_kit = Kit(code="TEST-M2", name="Lost Overdue Maint", status=KitStatus.lost, next_maintenance_date=past_date)
+    in_maintenance_kit = Kit(code="TEST-M3", name="In Maint", status=KitStatus.in_maintenance, next_maintenance_date=past_date)
+    current_kit = Kit(code="TEST-M4", name="Current Maint", status=KitStatus.available, next_maintenance_date=future_date)
+    db_session.add_all([overdue_kit, lost_kit, in_maintenance_kit, current_kit])
+    db_session.commit()
+    
+    kits_with_warnings = get_all_kits_with_warnings(db_session)
+    
+    assert {k["kit_code"] for k in kits_with_warnings} == {"TEST-M1", "TEST-M2"}
+    for kit_warning in kits_with_warnings:
+        assert kit_warning["warnings"].overdue_maintenance is True
+        assert kit_warning["warnings"].days_maintenance_overdue == OVERDUE_MAINTENANCE_WARNING_DAYS + 3
+
+
+def test_get_all_kits_with_warnings_extended_custody_threshold(db_session: Session):
+    """Test that only kits out for at least EXTENDED_CUSTODY_WARNING_DAYS are reported"""
+    user = User(
+        email="test@example.com",
+        name="Test User",
+        oauth_provider="google",
+        oauth_id="test-123",
+        role=UserRole.coach
+    )
+    extended_kit = Kit(code="TEST-E1", name="Extended", status=KitStatus.checked_out, current_custodian_name="Alice")
+    recent_kit = Kit(code="TEST-E2", name="Recent", status=KitStatus.checked_out, current_custodian_name="Bob")
+    db_session.add_all([user, extended_kit, recent_kit])
+    db_session.commit()
+    
+    for kit, days_out in ((extended_kit, EXTENDED_CUSTODY_WARNING_DAYS), (recent_kit, EXTENDED_CUSTODY_WARNING_DAYS - 1)):
+        db_session.add(CustodyEvent(
+            event_type=CustodyEventType.checkout_offsite,
+            kit_id=kit.id,
+            initiated_by_id=user.id,
+            initiated_by_name=user.name,
+            custodian_name=kit.current_custodian_name,
+            created_at=datetime.combine(date.today() - timedelta(days=days_out), datetime.min.time())
+        ))
+    db_session.commit()
+    
+    kits_with_warnings = get_all_kits_with_warnings(db_session)
+    
+    assert [k["kit_code"] for k in kits_with_warnings] == ["TEST-E1"]
+    assert kits_with_warnings[0]["warnings"].extended_custody is True
+    assert kits_with_warnings[0]["warnings"].days_checked_out == EXTENDED_CUSTODY_WARNING_DAYS
@@ -4,6 +4,8 @@ import { api } from './api';
 import type { 
   CustodyCheckoutRequest, 
   CustodyCheckoutResponse,
+  CustodyBulkCheckoutRequest,
+  CustodyBulkCheckoutResponse,
   OffSiteCheckoutRequest,
   OffSiteCheckoutResponse,
   ApprovalDecisionRequest,
@@ -24,6 +26,13 @@ export const custodyService = {
     return api.post<CustodyCheckoutResponse>('/custody/checkout', request);
   },
 
+  /**
+   * Check out several kits on-premises in one request (buffered QR scans)
+   */
+  async checkoutKitsBulk(request: CustodyBulkCheckoutRequest): Promise<CustodyBulkCheckoutResponse> {
+    return api.post<CustodyBulkCheckoutResponse>('/custody/checkout/bulk', request);
+  },
+
   /**
    * Request off-site checkout approval
    */
@@ -48,6 +48,15 @@ export interface CustodyCheckoutResponse {
   kit_code: string;
 }
 
+export interface CustodyBulkCheckoutRequest {
+  checkouts: CustodyCheckoutRequest[];
+}
+
+export interface CustodyBulkCheckoutResponse {
+  message: string;
+  checkouts: CustodyCheckoutResponse[];
+}
+
 // Off-site checkout types
 export interface OffSiteCheckoutRequest {
   kit_code: string;